@@ -5,17 +5,153 @@ import gzip
 import io
 import json
 import pandas as pd
+import numpy as np
 import time
 import os
-from datetime import datetime, timedelta
+import threading
+import atexit
+import hashlib
+import bisect
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 from dotenv import load_dotenv,find_dotenv
 from http.cookies import SimpleCookie
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from fetch_and_extract import MappingIndex, current_ist_date
+
+# Optional: the snapshot archive and the warm-start snapshots are written as Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
 # Load environment variables
 load_dotenv(find_dotenv())
 
+# Buildup fan-out settings (OI based shortlist)
+BUILDUP_FETCH_WORKERS = int(os.getenv('BUILDUP_FETCH_WORKERS', '16'))
+BUILDUP_FETCH_TIMEOUT = float(os.getenv('BUILDUP_FETCH_TIMEOUT', '30'))
+BUILDUP_FETCH_DEADLINE = float(os.getenv('BUILDUP_FETCH_DEADLINE', '45'))
+
+# Columns carried into the shortlisted stocks table
+SHORTLIST_MOVER_COLUMNS = ['Symbol', 'Company Name', 'LTP', 'Change', '% Change', 'Volume']
+SHORTLIST_OI_COLUMNS = ['avgInOI', 'chngInOI', 'pctChngInOI']
+
+# Shared deadline for the three Shortlisted Stocks sources
+SHORTLIST_FETCH_DEADLINE = float(os.getenv('SHORTLIST_FETCH_DEADLINE', '45'))
+
+# Auto-refresh interval for the dashboard sections
+AUTO_REFRESH_INTERVAL = int(os.getenv('AUTO_REFRESH_INTERVAL', '60'))
+
+# Background collector settings. Each upstream endpoint starts at COLLECTOR_POLL_INTERVAL and
+# adapts to how often its payload actually changes, within the min/max bounds
+COLLECTOR_POLL_INTERVAL = int(os.getenv('COLLECTOR_POLL_INTERVAL', '60'))
+COLLECTOR_MIN_POLL_INTERVAL = int(os.getenv('COLLECTOR_MIN_POLL_INTERVAL', '30'))
+COLLECTOR_MAX_POLL_INTERVAL = int(os.getenv('COLLECTOR_MAX_POLL_INTERVAL', '300'))
+COLLECTOR_FIRST_SNAPSHOT_TIMEOUT = 90
+
+# Snapshots kept per source in the history ring buffer, a full 09:15-15:30 session of changes at
+# the fastest poll interval by default
+HISTORY_CAPACITY = int(os.getenv('HISTORY_CAPACITY', str((6 * 3600 + 15 * 60) // max(min(COLLECTOR_POLL_INTERVAL, COLLECTOR_MIN_POLL_INTERVAL), 1) + 1)))
+# Longest "last N snapshots" read served as a view of the ring buffer; these slots are stored twice
+HISTORY_VIEW_WINDOW = int(os.getenv('HISTORY_VIEW_WINDOW', '120'))
+
+# Column that identifies the symbol of a row in each source's snapshots
+HISTORY_SYMBOL_COLUMNS = {
+    'oi_spurts': 'symbol',
+    'oi_trend': 'symbol',
+    'gainers': 'Symbol',
+    'losers': 'Symbol',
+    'shortlisted': 'Symbol',
+    'oi_based_shortlist': 'Symbol',
+}
+
+# Append-only archive of every polled payload, parquet files partitioned by source and IST date.
+# Queued rows are written every ARCHIVE_FLUSH_INTERVAL seconds; set ARCHIVE_DIR to '' to disable
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+ARCHIVE_FLUSH_INTERVAL = int(os.getenv('ARCHIVE_FLUSH_INTERVAL', '300'))
+ARCHIVE_FLUSH_ROWS = 50_000
+
+# Display names of the Dhan daily gainers / losers fields
+MOVERS_COLUMN_NAMES = {
+    'sym': 'Symbol',
+    'disp': 'Company Name',
+    'ltp': 'LTP',
+    'chng': 'Change',
+    'pchng': '% Change',
+    'tvol': 'Volume',
+    'tval': 'Turnover'
+}
+
+# Buildup data is published in 15 minute intervals, aligned to IST
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60
+BUILDUP_INTERVAL_SECONDS = 15 * 60
+BUILDUP_CACHE_GRACE_SECONDS = int(os.getenv('BUILDUP_CACHE_GRACE_SECONDS', '20'))
+
+# Fields of a buildup record used by format_buildup_data
+BUILDUP_RECORD_FIELDS = ['st', 'et', 'btc', 'l', 'h', 'toi', 'oipch', 'fr', 'sqf', 'vol']
+
+BUILDUP_ZONES = {
+    "LB": "Long Buildup",
+    "SB": "Short Buildup",
+    "LU": "Long Unwinding",
+    "SC": "Short Covering"
+}
+
+# Buildup pattern slots: the 15 minute intervals of the NSE session, 09:15 to 15:30 IST
+SESSION_OPEN_SECONDS = 9 * 3600 + 15 * 60
+SESSION_SLOTS = 25
+BUILDUP_ZONE_CODES = {code: position + 1 for position, code in enumerate(BUILDUP_ZONES)}  # 0 = no data
+BUILDUP_ZONE_NAMES = (None, *BUILDUP_ZONES.values())
+
+# Pattern the OI based shortlist looks for: "<slots>@<HH:MM>" for that many consecutive
+# intervals starting at a fixed time, or just "<slots>" for a run anywhere in the session
+BUILDUP_PATTERN_RULE = os.getenv('BUILDUP_PATTERN_RULE', '2@09:15')
+
+# 'HH:MM' label for every minute of the day
+CLOCK_LABELS = np.array([f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)], dtype=object)
+
+# Display formatting of the typed buildup table, applied at render time
+BUILDUP_COLUMN_CONFIG = {
+    "Low": st.column_config.NumberColumn(format="%.2f"),
+    "High": st.column_config.NumberColumn(format="%.2f"),
+    "Open Interest (OI)": st.column_config.NumberColumn(format="%d"),
+    "OI Change (%)": st.column_config.NumberColumn(format="%.2f%%"),
+    "Fresh": st.column_config.NumberColumn(format="%.2f"),
+    "Square-Off": st.column_config.NumberColumn(format="%.2f"),
+    "Traded Contracts": st.column_config.NumberColumn(format="%d"),
+}
+
+# Shared upstream session settings
+UPSTREAM_SESSION_MAX_AGE = 30 * 60  # 30 minutes
+UPSTREAM_SESSION_RENEW_AFTER = int(os.getenv('UPSTREAM_SESSION_RENEW_AFTER', str(25 * 60)))
+UPSTREAM_SESSION_CHECK_INTERVAL = 30
+
+# Per-host circuit breaker: open after this many consecutive failures, then probe
+# once every CIRCUIT_RESET_TIMEOUT seconds, doubling up to CIRCUIT_MAX_RESET_TIMEOUT
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+CIRCUIT_MAX_RESET_TIMEOUT = float(os.getenv('CIRCUIT_MAX_RESET_TIMEOUT', '300'))
+
+# Upstream responses that count as a failure of the host (besides 5xx and transport errors)
+UPSTREAM_FAILURE_STATUSES = (401, 403, 429)
+
+# Latest snapshots and upstream cookie jars are saved here and loaded on boot; '' disables
+WARM_START_DIR = os.getenv('WARM_START_DIR', 'state')
+
+# Browser profile cloudscraper emulates for the warmed-up upstream sessions
+SCRAPER_BROWSER = {'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+
+# How often the futures mapping files are checked for a newer extraction
+MAPPING_RELOAD_CHECK_INTERVAL = int(os.getenv('MAPPING_RELOAD_CHECK_INTERVAL', '30'))
+
+# Suggestions shown by the sidebar symbol picker
+SYMBOL_SEARCH_LIMIT = 8
+
 # Page configuration
 st.set_page_config(
     page_title="NSE OI Spurts Live Dashboard",
@@ -24,66 +160,328 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def load_futstk_mapping():
+def load_futstk_mapping(json_path='futstk_mapping.json'):
     """Load the futstk mapping JSON file"""
     try:
-        with open('futstk_mapping.json', 'r') as f:
+        with open(json_path, 'r') as f:
             mapping = json.load(f)
         return mapping
     except Exception as e:
-        st.error(f"Error loading futstk mapping: {e}")
+        print(f"Error loading futstk mapping: {e}")
         return {}
 
+def load_futstk_index(index_path='futstk_mapping.idx', json_path='futstk_mapping.json'):
+    """Memory-map the binary futstk index, or build one from the JSON if it is missing or older"""
+    try:
+        if not os.path.exists(json_path) or os.path.getmtime(index_path) >= os.path.getmtime(json_path):
+            return MappingIndex.open(index_path)
+    except (OSError, ValueError):
+        pass
+    return MappingIndex.from_mapping(load_futstk_mapping(json_path))
+
 # Initialize session state
-if 'data_history' not in st.session_state:
-    st.session_state.data_history = []
 if 'last_update' not in st.session_state:
     st.session_state.last_update = None
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = True
-if 'gainers_data_history' not in st.session_state:
-    st.session_state.gainers_data_history = []
 if 'gainers_last_update' not in st.session_state:
     st.session_state.gainers_last_update = None
 if 'selected_section' not in st.session_state:
     st.session_state.selected_section = "OI Spurts"
-if 'losers_data_history' not in st.session_state:
-    st.session_state.losers_data_history = []
 if 'losers_last_update' not in st.session_state:
     st.session_state.losers_last_update = None
-if 'shortlisted_data_history' not in st.session_state:
-    st.session_state.shortlisted_data_history = []
 if 'shortlisted_last_update' not in st.session_state:
     st.session_state.shortlisted_last_update = None
-if 'oi_trend_data_history' not in st.session_state:
-    st.session_state.oi_trend_data_history = []
 if 'oi_trend_last_update' not in st.session_state:
     st.session_state.oi_trend_last_update = None
 if 'selected_stock_symbol' not in st.session_state:
     st.session_state.selected_stock_symbol = None
 if 'buildup_data' not in st.session_state:
     st.session_state.buildup_data = None
-if 'futstk_mapping' not in st.session_state:
-    st.session_state.futstk_mapping = load_futstk_mapping()
 if 'show_stock_detail_page' not in st.session_state:
     st.session_state.show_stock_detail_page = False
-if 'oi_based_shortlist_data_history' not in st.session_state:
-    st.session_state.oi_based_shortlist_data_history = []
 if 'oi_based_shortlist_last_update' not in st.session_state:
     st.session_state.oi_based_shortlist_last_update = None
-# Session management for scrapers
-if 'nse_scraper' not in st.session_state:
-    st.session_state.nse_scraper = None
-if 'nse_session_established' not in st.session_state:
-    st.session_state.nse_session_established = False
-if 'session_creation_time' not in st.session_state:
-    st.session_state.session_creation_time = None
+
+class CircuitBreaker:
+    """Stops calling an upstream host that keeps failing
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail
+    fast. Once `reset_timeout` seconds have passed a single half-open probe goes
+    through: success closes the circuit, failure reopens it with the timeout doubled
+    up to `max_reset_timeout`.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+    
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                 max_reset_timeout=CIRCUIT_MAX_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.last_error = None
+        self._opened_at = None
+        self._lock = threading.Lock()
+    
+    def retry_in(self):
+        """Seconds until the next half-open probe, 0 unless the circuit is open"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(self._opened_at + self.reset_timeout - time.monotonic(), 0)
+    
+    def is_open(self):
+        """True while calls are refused, without claiming the half-open probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                return True
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+    
+    def allow(self):
+        """True if a call may go upstream now; claims the probe when the circuit is due one"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"Circuit for {self.host} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self.last_error = None
+    
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            elif self.state == self.CLOSED and self.failures < self.failure_threshold:
+                return
+            if self.state != self.OPEN:
+                print(f"Circuit for {self.host} opened for {self.reset_timeout:.0f}s: {error}")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+    
+    def rejection(self):
+        """Error returned for a call refused while the circuit is open"""
+        return f"{self.host} unavailable ({self.last_error}), next attempt in {self.retry_in():.0f}s"
+
+class UpstreamSession:
+    """Thread-safe scraper session for one upstream host, shared by every browser session
+
+    The Cloudflare handshake and warmup happen once per process instead of once per tab.
+    While the session is in use a background thread renews the scraper before it
+    reaches UPSTREAM_SESSION_MAX_AGE.
+    Calls made through request() go through the host's CircuitBreaker.
+    """
+    
+    def __init__(self, host, factory, max_age=UPSTREAM_SESSION_MAX_AGE, renew_after=UPSTREAM_SESSION_RENEW_AFTER, state_path=None):
+        self.host = host
+        self.max_age = max_age
+        self.renew_after = renew_after
+        self.state_path = state_path  # Cookie jar saved for the next process, see save_state()
+        self.scraper = None
+        self.created_at = None
+        self.last_error = None
+        self._factory = factory
+        self._lock = threading.Lock()  # Guards scraper/created_at
+        self._renew_lock = threading.Lock()  # Only one handshake at a time
+        self._renewal_thread = None
+        self._last_used = None  # time.monotonic() of the last get()/request()
+        self._renew_failures = 0  # Consecutive failed background renewals
+        self._next_renewal = 0  # time.monotonic() before which the renewal loop waits
+        self.breaker = CircuitBreaker(host)
+        if state_path:
+            self.restore_state()
+    
+    def age_seconds(self):
+        with self._lock:
+            if self.created_at is None:
+                return None
+            return (datetime.now() - self.created_at).total_seconds()
+    
+    def is_established(self):
+        age = self.age_seconds()
+        return age is not None and age <= self.max_age
+    
+    def get(self):
+        """Return (scraper, error), creating the session if missing or expired"""
+        if self.breaker.is_open():
+            return None, self.breaker.rejection()
+        self._last_used = time.monotonic()
+        return self._get()
+    
+    def request(self, method, url, refresh_on=(), **kwargs):
+        """Return (response, error) for one upstream call, guarded by the circuit breaker
+
+        A response status in `refresh_on` renews the session once and repeats the
+        call. HTTP error responses are returned as is; `error` is only set when no
+        response was received.
+        """
+        if not self.breaker.allow():
+            return None, self.breaker.rejection()
+        self._last_used = time.monotonic()
+        response = None
+        try:
+            scraper, error = self._get()
+            if not error:
+                response = getattr(scraper, method)(url, **kwargs)
+                if response.status_code in refresh_on:
+                    scraper, error = self.refresh(stale_scraper=scraper)
+                    if not error:
+                        response = getattr(scraper, method)(url, **kwargs)
+        except Exception as e:
+            error = f"Request to {self.host} failed: {e}"
+        
+        if error:
+            self.breaker.record_failure(error)
+            return None, error
+        if response.status_code in UPSTREAM_FAILURE_STATUSES or response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success()
+        return response, None
+    
+    def _get(self):
+        if self.is_established():
+            return self.scraper, None
+        with self._renew_lock:
+            # Another thread may have finished the handshake while we waited
+            if self.is_established():
+                return self.scraper, None
+            return self._renew()
+    
+    def refresh(self, stale_scraper=None):
+        """Force a new session; skip it if `stale_scraper` was already replaced"""
+        with self._renew_lock:
+            if stale_scraper is not None and self.scraper is not stale_scraper and self.is_established():
+                return self.scraper, None
+            return self._renew()
+    
+    def _renew(self):
+        scraper, error = self._factory()
+        with self._lock:
+            if error:
+                self.last_error = error
+                return None, error
+            self.scraper = scraper
+            self.created_at = datetime.now()
+            self.last_error = None
+        print(f"Upstream session for {self.host} renewed")
+        self.save_state()
+        return scraper, None
+    
+    def save_state(self):
+        """Save the cookie jar and user agent so a restarted process can skip the warmup"""
+        with self._lock:
+            scraper, created_at = self.scraper, self.created_at
+        if not self.state_path or scraper is None:
+            return
+        try:
+            state = {
+                'host': self.host,
+                'created_at': created_at.isoformat(),
+                'user_agent': scraper.headers.get('User-Agent'),
+                'cookies': [
+                    {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                     'path': cookie.path, 'expires': cookie.expires, 'secure': cookie.secure}
+                    for cookie in list(scraper.cookies)
+                ],
+            }
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            # Session cookies are credentials, keep them private to the app user
+            temp_path = self.state_path + '.tmp'
+            with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except (OSError, RuntimeError) as e:
+            print(f"Could not save upstream session for {self.host}: {e}")
+    
+    def restore_state(self):
+        """Reuse the session saved by a previous process while it is younger than max_age"""
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            created_at = datetime.fromisoformat(state['created_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if (datetime.now() - created_at).total_seconds() > self.max_age:
+            return False
+        
+        scraper = cloudscraper.create_scraper(browser=SCRAPER_BROWSER)
+        if state.get('user_agent'):
+            # Cloudflare clearance cookies are only honoured for the user agent they were issued to
+            scraper.headers['User-Agent'] = state['user_agent']
+        now = time.time()
+        for cookie in state.get('cookies', []):
+            if cookie.get('expires') and cookie['expires'] < now:
+                continue
+            scraper.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain') or '',
+                                path=cookie.get('path', '/'), expires=cookie.get('expires'),
+                                secure=cookie.get('secure', False))
+        with self._lock:
+            self.scraper = scraper
+            self.created_at = created_at
+        print(f"Upstream session for {self.host} restored from {self.state_path}")
+        return True
+    
+    def start_renewal(self):
+        """Start the background thread that renews the session before it expires"""
+        if self._renewal_thread is not None:
+            return
+        self._renewal_thread = threading.Thread(
+            target=self._renewal_loop, name=f"session-renewal-{self.host}", daemon=True
+        )
+        self._renewal_thread.start()
+    
+    def in_use(self):
+        """True if the session was asked for within the last max_age seconds"""
+        last_used = self._last_used
+        return last_used is not None and time.monotonic() - last_used <= self.max_age
+    
+    def _renewal_loop(self):
+        while True:
+            time.sleep(UPSTREAM_SESSION_CHECK_INTERVAL)
+            age = self.age_seconds()
+            if age is None:
+                continue
+            # Upstream rotates cookies on API responses, keep the saved jar current
+            self.save_state()
+            # Idle processes don't need a warm session, the next get() will create one
+            if age < self.renew_after or not self.in_use() or time.monotonic() < self._next_renewal:
+                continue
+            if not self.breaker.allow():
+                continue
+            with self._renew_lock:
+                _, error = self._renew()
+            if error:
+                # Back off instead of starting a new warmup every check interval
+                self.breaker.record_failure(error)
+                self._renew_failures += 1
+                delay = min(UPSTREAM_SESSION_CHECK_INTERVAL * 2 ** self._renew_failures, CIRCUIT_MAX_RESET_TIMEOUT)
+                self._next_renewal = time.monotonic() + delay
+                print(f"Renewing upstream session for {self.host} failed, next attempt in {delay:.0f}s: {error}")
+            else:
+                self.breaker.record_success()
+                self._renew_failures = 0
+                self._next_renewal = 0
 
 #latest one
 def create_nse_session():
     try:
         scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False},
+            browser=SCRAPER_BROWSER,
             delay=1,
             debug=False
         )
@@ -110,7 +508,6 @@ def create_nse_session():
 
         response = scraper.get(main_url, headers=headers, timeout=45)
         if response.status_code == 200:
-            print("Session created successfully")
             return scraper, None
         else:
             return None, f"Failed to establish session: {response.status_code}"
@@ -261,22 +658,15 @@ def create_nse_session():
 #     except Exception as e:
 #         return None, f"Session creation failed: {str(e)}"
 
-def refresh_nse_session():
-    """Refresh the NSE session"""
-    st.session_state.nse_scraper = None
-    st.session_state.nse_session_established = False
-    st.session_state.session_creation_time = None
-    return create_nse_session()
+def refresh_nse_session(stale_scraper=None):
+    """Refresh the shared NSE session"""
+    return get_upstream_sessions()['nse'].refresh(stale_scraper)
 
 def create_buildup_session():
     """Create a new Buildup OI API session with cloudscraper"""
     try:
         scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            },
+            browser=SCRAPER_BROWSER,
             delay=1,
             debug=False
         )
@@ -286,9 +676,6 @@ def create_buildup_session():
         main_response = scraper.get(main_page_url, timeout=30)
         
         if main_response.status_code == 200:
-            st.session_state.buildup_scraper = scraper
-            st.session_state.buildup_session_established = True
-            st.session_state.buildup_session_creation_time = datetime.now()
             return scraper, None
         else:
             return None, f"Failed to establish buildup session: {main_response.status_code}"
@@ -297,35 +684,83 @@ def create_buildup_session():
         return None, f"Buildup session creation failed: {str(e)}"
 
 def refresh_buildup_session():
-    """Refresh the Buildup OI API session"""
-    st.session_state.buildup_scraper = None
-    st.session_state.buildup_session_established = False
-    st.session_state.buildup_session_creation_time = None
+    """Refresh the shared Buildup OI API session"""
     st.session_state.buildup_data = None  # Clear cached data
-    return create_buildup_session()
+    return get_upstream_sessions()['buildup'].refresh()
 
-#old one
-def fetch_nse_data():
-    """Fetch data from NSE API using cloudscraper with dynamic session management"""
+def create_scanx_session():
+    """Create a scraper for the Dhan scanx API (no warmup page needed)"""
     try:
-        # Check if we need to create or refresh session
-        session_age_limit = 30 * 60  # 30 minutes
-        current_time = datetime.now()
-        
-        need_new_session = (
-            not st.session_state.nse_session_established or
-            st.session_state.nse_scraper is None or
-            (st.session_state.session_creation_time and 
-             (current_time - st.session_state.session_creation_time).seconds > session_age_limit)
-        )
-        
-        if need_new_session:
-            scraper, error = create_nse_session()
-            if error:
-                return None, error
+        return cloudscraper.create_scraper(), None
+    except Exception as e:
+        return None, f"Scanx session creation failed: {str(e)}"
+
+@st.cache_resource(show_spinner=False)
+def get_upstream_sessions():
+    """Process-wide upstream sessions, one per host, shared by all browser sessions"""
+    factories = {
+        'nse': ('www.nseindia.com', create_nse_session),
+        'buildup': ('options-trader.dhan.co', create_buildup_session),
+        'scanx': ('scanx.dhan.co', create_scanx_session),
+    }
+    sessions = {}
+    for name, (host, factory) in factories.items():
+        state_path = os.path.join(WARM_START_DIR, 'sessions', f"{name}.json") if WARM_START_DIR else None
+        sessions[name] = UpstreamSession(host, factory, state_path=state_path)
+    for session in sessions.values():
+        session.start_renewal()
+        atexit.register(session.save_state)
+    return sessions
+
+class SingleFlight:
+    """Coalesce identical in-flight calls so concurrent callers share one upstream request
+
+    The first caller for a key runs the function; callers arriving while it is still
+    running wait for it and receive the same result (or the same exception).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+        
+        if not leader:
+            call['done'].wait()
         else:
-            scraper = st.session_state.nse_scraper
+            try:
+                call['result'] = fn(*args, **kwargs)
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
         
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+@st.cache_resource(show_spinner=False)
+def get_singleflight():
+    """Process-wide request coalescing layer shared by every dashboard session"""
+    return SingleFlight()
+
+def fetch_nse_data():
+    """Fetch NSE OI spurts data, sharing one request between concurrent identical calls"""
+    api_url = os.getenv('NSE_OI_SPURTS_API_URL', 'https://www.nseindia.com/api/live-analysis-oi-spurts-underlyings')
+    return get_singleflight().do(('GET', api_url), request_nse_data)
+
+#old one
+def request_nse_data():
+    """Fetch data from NSE API using cloudscraper with dynamic session management"""
+    try:
         # API endpoint
         api_url = os.getenv('NSE_OI_SPURTS_API_URL', 'https://www.nseindia.com/api/live-analysis-oi-spurts-underlyings')
         
@@ -339,26 +774,15 @@ def fetch_nse_data():
             "sec-fetch-site": "same-origin",
             "x-requested-with": "XMLHttpRequest"
         }
-
         
-        # Make the API request with retry and session refresh logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = scraper.get(api_url, headers=headers, timeout=30, allow_redirects=True)
-                
-                # If we get 401, try refreshing session once
-                if response.status_code == 401 and attempt == 0:
-                    scraper, refresh_error = refresh_nse_session()
-                    if refresh_error:
-                        return None, f"Session refresh failed: {refresh_error}"
-                    continue
-                    
-                break
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    return None, f"Request failed after {max_retries} attempts: {str(e)}"
-                time.sleep(2 ** attempt)  # Exponential backoff
+        # One attempt through the shared session and the NSE circuit breaker. A 401/403
+        # (e.g. a restored session upstream no longer accepts) renews the session once;
+        # any other failure waits for the collector's next cycle instead of retrying inline
+        response, error = get_upstream_sessions()['nse'].request(
+            'get', api_url, refresh_on=(401, 403), headers=headers, timeout=30, allow_redirects=True
+        )
+        if error:
+            return None, error
         
         # Decompression logic with better error handling
         content_encoding = response.headers.get("Content-Encoding", "")
@@ -551,8 +975,6 @@ def fetch_nse_data():
 def fetch_daily_gainers():
     """Fetch Daily Gainers F&O Stocks data using cloudscraper"""
     try:
-        scraper = cloudscraper.create_scraper()
-        
         url = os.getenv('DHAN_DAILY_API_URL', 'https://scanx.dhan.co/scanx/daygnl')
         
         headers = {
@@ -577,7 +999,9 @@ def fetch_daily_gainers():
             }
         }
         
-        response = scraper.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+        response, error = get_upstream_sessions()['scanx'].request('post', url, headers=headers, data=json.dumps(payload), timeout=30)
+        if error:
+            return None, error
         
         if response.status_code == 200:
             data = response.json()
@@ -591,8 +1015,6 @@ def fetch_daily_gainers():
 def fetch_daily_losers():
     """Fetch Daily Losers F&O Stocks data using cloudscraper"""
     try:
-        scraper = cloudscraper.create_scraper()
-        
         url = os.getenv('DHAN_DAILY_API_URL', 'https://scanx.dhan.co/scanx/daygnl')
         
         headers = {
@@ -617,7 +1039,9 @@ def fetch_daily_losers():
             }
         }
         
-        response = scraper.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+        response, error = get_upstream_sessions()['scanx'].request('post', url, headers=headers, data=json.dumps(payload), timeout=30)
+        if error:
+            return None, error
         
         if response.status_code == 200:
             data = response.json()
@@ -629,17 +1053,16 @@ def fetch_daily_losers():
         return None, str(e)
 
 def process_data(raw_data):
-    """Process raw API data into a pandas DataFrame"""
+    """Process raw API data into a pandas DataFrame, returned as (df, error)"""
     try:
         if 'data' in raw_data:
             df = pd.DataFrame(raw_data['data'])
             df['timestamp'] = datetime.now()
-            return df
+            return df, None
         else:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
     except Exception as e:
-        st.error(f"Error processing data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"Error processing data: {e}"
 
 def process_gainers_data(raw_data):
     """Process Daily Gainers API data into a pandas DataFrame"""
@@ -648,22 +1071,12 @@ def process_gainers_data(raw_data):
             df = pd.DataFrame(raw_data['data'])
             df['timestamp'] = datetime.now()
             # Rename columns for better display
-            column_mapping = {
-                'sym': 'Symbol',
-                'disp': 'Company Name',
-                'ltp': 'LTP',
-                'chng': 'Change',
-                'pchng': '% Change',
-                'tvol': 'Volume',
-                'tval': 'Turnover'
-            }
-            df = df.rename(columns=column_mapping)
-            return df
+            df = df.rename(columns=MOVERS_COLUMN_NAMES)
+            return df, None
         else:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
     except Exception as e:
-        st.error(f"Error processing gainers data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"Error processing gainers data: {e}"
 
 def process_losers_data(raw_data):
     """Process Daily Losers API data into a pandas DataFrame"""
@@ -672,69 +1085,349 @@ def process_losers_data(raw_data):
             df = pd.DataFrame(raw_data['data'])
             df['timestamp'] = datetime.now()
             # Rename columns for better display
-            column_mapping = {
-                'sym': 'Symbol',
-                'disp': 'Company Name',
-                'ltp': 'LTP',
-                'chng': 'Change',
-                'pchng': '% Change',
-                'tvol': 'Volume',
-                'tval': 'Turnover'
-            }
-            df = df.rename(columns=column_mapping)
-            return df
+            df = df.rename(columns=MOVERS_COLUMN_NAMES)
+            return df, None
         else:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
     except Exception as e:
-        st.error(f"Error processing losers data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"Error processing losers data: {e}"
 
 
 
-def get_secid_for_symbol(symbol, mapping):
-    """Get secid for a symbol from July 2025 futures mapping"""
-    try:
-        # Look for July 2025 futures mapping
-        key = f"{symbol}-Jul2025-FUT"
-        if key in mapping:
-            secid = mapping[key]
-            # Debug logging for RBLBANK specifically
-            if symbol == "RBLBANK":
-                st.info(f"✅ Found mapping for {symbol}: {key} -> secid: {secid}")
-            return secid
-        else:
-            # Debug logging when mapping not found
-            if symbol == "RBLBANK":
-                st.warning(f"❌ No mapping found for {key} in futstk_mapping.json")
-                st.write(f"Available keys containing '{symbol}': {[k for k in mapping.keys() if symbol in k]}")
+class FuturesIndex:
+    """Stock futures secids keyed by (underlying, expiry date)
+
+    Backed by a MappingIndex, so creating one does not depend on the mapping size.
+    An underlying's contracts are read with one prefix search the first time it is
+    asked for and kept sorted by expiry, so the near, next and far month contracts
+    resolve from the current date with a bisect and keep working across monthly
+    rollovers.
+    """
+    
+    CONTRACTS = ('near', 'next', 'far')
+    
+    def __init__(self, mapping_index):
+        self.mapping_index = mapping_index
+        self._contracts = {}  # underlying -> sorted [(expiry date, secid)]
+        self._search_index = None
+    
+    @property
+    def search_index(self):
+        """SymbolSearchIndex over the underlyings, built on first use"""
+        if self._search_index is None:
+            underlyings = set()
+            for trading_symbol, _ in self.mapping_index.items():
+                parsed = parse_futures_symbol(trading_symbol)
+                if parsed is not None:
+                    underlyings.add(parsed[0])
+            self._search_index = SymbolSearchIndex(underlyings)
+        return self._search_index
+    
+    def contracts(self, underlying):
+        """All (expiry date, secid) pairs known for an underlying, sorted by expiry"""
+        contracts = self._contracts.get(underlying)
+        if contracts is None:
+            contracts = []
+            for trading_symbol, secid in self.mapping_index.items(f"{underlying}-"):
+                parsed = parse_futures_symbol(trading_symbol)
+                # 'BAJAJ-' also prefixes 'BAJAJ-AUTO-...', so match the whole underlying
+                if parsed is not None and parsed[0] == underlying:
+                    contracts.append((parsed[1], secid))
+            contracts.sort()
+            self._contracts[underlying] = contracts
+        return contracts
+    
+    def resolve(self, underlying, contract='near', today=None):
+        """Secid of the near, next or far month contract still live on `today`"""
+        contracts = self.contracts(underlying)
+        today = today or current_ist_date()
+        position = bisect.bisect_left(contracts, (today,)) + self.CONTRACTS.index(contract)
+        if position >= len(contracts):
             return None
+        return contracts[position][1]
+
+class SymbolSearchIndex:
+    """Case-insensitive prefix and substring search over a symbol universe
+
+    Prefix queries bisect a sorted key list. Substring queries of three or more
+    characters walk the shortest trigram posting list of the query and check each
+    candidate, stopping at the limit, so both stay well under a millisecond for
+    100k+ symbols.
+    """
+    
+    def __init__(self, symbols):
+        self.symbols = sorted(set(symbols), key=str.upper)
+        self._keys = [symbol.upper() for symbol in self.symbols]
+        self._trigrams = {}  # trigram -> ascending positions of the keys containing it
+        for position, key in enumerate(self._keys):
+            for trigram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                postings = self._trigrams.get(trigram)
+                if postings is None:
+                    postings = self._trigrams[trigram] = array('I')
+                postings.append(position)
+    
+    def __len__(self):
+        return len(self.symbols)
+    
+    def prefix(self, query, limit=SYMBOL_SEARCH_LIMIT):
+        """Symbols starting with `query`, alphabetically"""
+        key = query.strip().upper()
+        results = []
+        for position in range(bisect.bisect_left(self._keys, key), len(self._keys)):
+            if len(results) >= limit or not self._keys[position].startswith(key):
+                break
+            results.append(self.symbols[position])
+        return results
+    
+    def search(self, query, limit=SYMBOL_SEARCH_LIMIT):
+        """Prefix matches first, then other symbols containing `query` (3+ characters)"""
+        key = query.strip().upper()
+        if not key:
+            return []
+        results = self.prefix(key, limit)
+        if len(results) >= limit or len(key) < 3:
+            return results
+        
+        postings = min((self._trigrams.get(key[i:i + 3], ()) for i in range(len(key) - 2)), key=len)
+        for position in postings:
+            candidate = self._keys[position]
+            if key in candidate and not candidate.startswith(key):
+                results.append(self.symbols[position])
+                if len(results) >= limit:
+                    break
+        return results
+
+def parse_futures_symbol(trading_symbol):
+    """Split 'RELIANCE-Aug2025-FUT' into ('RELIANCE', expiry date); None if not a future"""
+    parts = trading_symbol.rsplit('-', 2)
+    if len(parts) != 3 or parts[2] != 'FUT':
+        return None
+    try:
+        contract_month = datetime.strptime(parts[1], '%b%Y')
+    except ValueError:
+        return None
+    return parts[0], monthly_expiry_date(contract_month.year, contract_month.month)
+
+def monthly_expiry_date(year, month):
+    """Last Thursday of the month, last Tuesday from September 2025 (NSE monthly expiry)
+
+    Holiday shifts are not modelled; the master file drops expired contracts anyway.
+    """
+    weekday = 1 if (year, month) >= (2025, 9) else 3
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last_day = next_month - timedelta(days=1)
+    return last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+
+class FuturesIndexHolder:
+    """Process-wide FuturesIndex that follows the mapping files on disk
+
+    At most every `check_interval` seconds the mtime and size of the index and JSON
+    are compared with those the current index was built from. When they differ (the
+    extractor only rewrites them when the mapping content changed) a new index is
+    built and swapped in with a single assignment, so sessions pick up a nightly
+    extraction on their next lookup while in-flight lookups finish on the old one.
+    """
+    
+    def __init__(self, index_path='futstk_mapping.idx', json_path='futstk_mapping.json',
+                 check_interval=MAPPING_RELOAD_CHECK_INTERVAL):
+        self.index_path = index_path
+        self.json_path = json_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = self._file_signature()
+        self._index = FuturesIndex(load_futstk_index(index_path, json_path))
+        self._checked_at = time.monotonic()
+        self.loaded_at = datetime.now()
+    
+    def _file_signature(self):
+        signature = []
+        for path in (self.index_path, self.json_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def get(self):
+        """Current index, reloaded first if the mapping files changed"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload_if_changed()
+        return self._index
+    
+    def reload_if_changed(self):
+        """Rebuild the index if the mapping files changed; True if it was swapped"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = self._file_signature()
+            if signature == self._signature:
+                return False
+            mapping_index = load_futstk_index(self.index_path, self.json_path)
+            if not len(mapping_index) and len(self._index.mapping_index):
+                # Keep serving the old mapping; the signature is left as is so the
+                # next check retries
+                return False
+            self._index = FuturesIndex(mapping_index)
+            self._signature = signature
+            self.loaded_at = datetime.now()
+            return True
+
+@st.cache_resource(show_spinner=False)
+def get_futures_index_holder():
+    return FuturesIndexHolder()
+
+def get_futures_index():
+    """Process-wide futures index shared by every dashboard session"""
+    return get_futures_index_holder().get()
+
+def get_secid_for_symbol(symbol, index, contract='near'):
+    """Get (secid, error) for a symbol's near (or next/far) month futures contract"""
+    try:
+        secid = index.resolve(symbol, contract)
+        if secid:
+            return secid, None
+        return None, f"No {contract} month futures contract found for {symbol} in futstk_mapping.json"
     except Exception as e:
-        st.error(f"Error getting secid for {symbol}: {e}")
+        return None, f"Error getting secid for {symbol}: {e}"
+
+class BuildupStore:
+    """Per-secid buildup intervals, grown incrementally across refreshes
+
+    Each refresh only parses records whose `st` is newer than the last stored
+    interval and appends them; the formatted table and the session slot codes
+    grow with it instead of being rebuilt for the whole day. An entry is valid until
+    the next IST 15 minute boundary (plus a grace period for upstream publishing
+    delay), since completed intervals never change.
+    """
+    
+    def __init__(self, interval=BUILDUP_INTERVAL_SECONDS, grace=BUILDUP_CACHE_GRACE_SECONDS):
+        self.interval = interval
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._entries = {}  # secid -> entry dict, see merge()
+    
+    def expiry_for(self, now):
+        """Epoch seconds at which data fetched at `now` goes stale"""
+        return next_interval_boundary(now - self.grace, self.interval) + self.grace
+    
+    def get(self, secid):
+        """Stored records for a secid, or None when missing or past its interval"""
+        entry = self._entries.get(str(secid))
+        if entry and time.time() < entry['expires_at']:
+            return entry['records']
         return None
+    
+    def formatted(self, secid):
+        entry = self._entries.get(str(secid))
+        return entry['formatted'] if entry else None
+    
+    def slot_codes(self, secid):
+        """Buildup zone code per session slot (see fill_buildup_slots), or None"""
+        entry = self._entries.get(str(secid))
+        return entry['slots'] if entry else None
+    
+    def merge(self, secid, raw_data):
+        """Append the records newer than the last stored interval; returns (all records, error)
 
-def fetch_buildup_data(secid):
+        Malformed records leave the stored entry as it was.
+        """
+        key = str(secid)
+        now = time.time()
+        try:
+            raw_data = sorted(raw_data, key=lambda row: row['st'])
+        except (KeyError, TypeError) as e:
+            return None, f"Malformed buildup records for secid {secid}: {e}"
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            # Start over on a new trading day or if upstream rewrote history
+            if entry is None or not entry['records'] or not raw_data or raw_data[0]['st'] != entry['records'][0]['st']:
+                entry = {'records': [], 'formatted': pd.DataFrame(), 'slots': np.zeros(SESSION_SLOTS, dtype='int8')}
+            
+            records = entry['records']
+            formatted = entry['formatted']
+            last_st = records[-1]['st'] if records else None
+            new_records = raw_data if last_st is None else [row for row in raw_data if row['st'] >= last_st]
+            
+            # The last stored interval may still have been in progress, replace it if it changed
+            if last_st is not None and new_records and new_records[0]['st'] == last_st:
+                if new_records[0] == records[-1]:
+                    new_records = new_records[1:]
+                else:
+                    records = records[:-1]
+                    formatted = formatted.iloc[:-1]
+            
+            if new_records:
+                new_formatted, error = format_buildup_data(new_records)
+                if error:
+                    return None, f"{error} (secid {secid})"
+                records = records + new_records
+                formatted = pd.concat([formatted, new_formatted], ignore_index=True)
+                # Concatenating categoricals with different categories falls back to object
+                formatted['Trading Zone'] = formatted['Trading Zone'].astype('category')
+                slots = fill_buildup_slots(entry['slots'].copy(), new_records)
+            else:
+                slots = entry['slots']
+            
+            self._entries[key] = {
+                'records': records,
+                'formatted': formatted,
+                'slots': slots,
+                'expires_at': self.expiry_for(now)
+            }
+        return records, None
+
+def next_interval_boundary(now, interval=BUILDUP_INTERVAL_SECONDS):
+    """Epoch seconds of the first IST interval boundary (09:15, 09:30, ...) after `now`"""
+    ist_seconds = int(now) + IST_OFFSET_SECONDS
+    return (ist_seconds // interval + 1) * interval - IST_OFFSET_SECONDS
+
+@st.cache_resource(show_spinner=False)
+def get_buildup_store():
+    """Process-wide buildup store shared by every dashboard session"""
+    return BuildupStore()
+
+def get_buildup_data(secid, timeout=30):
+    """Buildup records for a secid, refetched only once the stored interval has closed"""
+    store = get_buildup_store()
+    records = store.get(secid)
+    if records is not None:
+        return records, None
+    
+    raw_data, error = fetch_buildup_data(secid, timeout)
+    if error:
+        return None, error
+    get_snapshot_archive().record('buildup', raw_data, secid=str(secid))
+    return store.merge(secid, raw_data)
+
+def get_formatted_buildup_data(secid, timeout=30):
+    """Formatted buildup table for a secid from the incremental buildup store"""
+    records, error = get_buildup_data(secid, timeout)
+    if error:
+        return None, error
+    return get_buildup_store().formatted(secid), None
+
+def build_buildup_payload(secid):
+    """Request payload for 15 minute FUTSTK buildup data of a secid"""
+    return {
+        "Data": {
+            "exch": "NSE",
+            "seg": "D",
+            "inst": "FUTSTK",
+            "timeinterval": "15",
+            "secid": int(secid)
+        }
+    }
+
+def fetch_buildup_data(secid, timeout=30):
+    """Fetch buildup data for a secid, sharing one request between concurrent identical calls"""
+    url = os.getenv('DHAN_BUILDUP_API_URL', 'https://ticks.dhan.co/builtup')
+    key = ('POST', url, json.dumps(build_buildup_payload(secid), sort_keys=True))
+    return get_singleflight().do(key, request_buildup_data, secid, timeout)
+
+def request_buildup_data(secid, timeout=30):
     """Fetch buildup data for a specific secid using the provided API"""
     try:
-        # Debug logging for RBLBANK secid specifically
-        if secid == "53427":
-            st.info(f"🔍 Fetching buildup data for RBLBANK with secid: {secid}")
-        
-        # Use existing buildup session or create new one
-        if not st.session_state.get('buildup_session_established', False) or st.session_state.get('buildup_scraper') is None:
-            scraper, error = create_buildup_session()
-            if error:
-                return None, f"Failed to create buildup session: {error}"
-        else:
-            scraper = st.session_state.buildup_scraper
-            
-            # Check if session is older than 30 minutes and refresh if needed
-            if st.session_state.get('buildup_session_creation_time'):
-                session_age = datetime.now() - st.session_state.buildup_session_creation_time
-                if session_age.total_seconds() > 1800:  # 30 minutes
-                    scraper, error = refresh_buildup_session()
-                    if error:
-                        return None, f"Failed to refresh buildup session: {error}"
-        
         url = os.getenv('DHAN_BUILDUP_API_URL', 'https://ticks.dhan.co/builtup')
         
         headers = {
@@ -758,17 +1451,12 @@ def fetch_buildup_data(secid):
             "user-agent": os.getenv('USER_AGENT', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
         }
         
-        payload = {
-            "Data": {
-                "exch": "NSE",
-                "seg": "D",
-                "inst": "FUTSTK",
-                "timeinterval": "15",
-                "secid": int(secid)
-            }
-        }
+        payload = build_buildup_payload(secid)
         
-        response = scraper.post(url, headers=headers, json=payload, timeout=30)
+        # Shared buildup session, guarded by the buildup host's circuit breaker
+        response, error = get_upstream_sessions()['buildup'].request('post', url, headers=headers, json=payload, timeout=timeout)
+        if error:
+            return None, error
         
         if response.status_code == 200:
             response_data = response.json()
@@ -791,35 +1479,108 @@ def fetch_buildup_data(secid):
     except Exception as e:
         return None, str(e)
 
-def format_buildup_data(raw_data):
-    """Format buildup data into a readable DataFrame"""
+def fetch_buildup_data_concurrently(secids, max_workers=None, timeout=None, deadline=None):
+    """Fetch buildup data for several secids using a bounded thread pool
+
+    Secids still valid in the buildup store are answered without a request. Each
+    request is limited by `timeout` seconds and the whole batch by `deadline`
+    seconds, so a refresh takes roughly as long as the slowest single request.
+    Returns a dict of secid -> (raw_data, error) for every requested secid.
+    """
+    max_workers = max_workers or BUILDUP_FETCH_WORKERS
+    timeout = timeout or BUILDUP_FETCH_TIMEOUT
+    deadline = deadline or BUILDUP_FETCH_DEADLINE
+    
+    results = {}
+    pending = []
+    store = get_buildup_store()
+    for secid in dict.fromkeys(secids):  # Drop duplicates, keep order
+        cached = store.get(secid)
+        if cached is not None:
+            results[secid] = (cached, None)
+        else:
+            pending.append(secid)
+    if not pending:
+        return results
+    
+    # Establish the buildup session up front so the workers don't all wait on the handshake
+    scraper, error = get_upstream_sessions()['buildup'].get()
+    if error:
+        results.update({secid: (None, f"Failed to create buildup session: {error}") for secid in pending})
+        return results
+    
+    tasks = {secid: (lambda secid=secid: get_buildup_data(secid, timeout)) for secid in pending}
+    results.update(run_with_deadline(tasks, deadline, max_workers=max_workers, name="buildup-fetch"))
+    return results
+
+def run_with_deadline(tasks, deadline, max_workers=None, name="upstream-fetch"):
+    """Run (data, error) returning callables concurrently under one shared deadline
+
+    `tasks` maps a key to a callable. Returns a dict with a (data, error) result for
+    every key; tasks still running when the deadline passes get an error result.
+    """
+    if not tasks:
+        return {}
+    
+    # Workers share the calling session's script context. The collector thread has
+    # none to share, so nothing is attached and the tasks must not call st.*
+    ctx = get_script_run_ctx(suppress_warning=True)
+    
+    def attach_script_ctx():
+        add_script_run_ctx(threading.current_thread(), ctx)
+    
+    results = {}
+    executor = ThreadPoolExecutor(
+        max_workers=min(max_workers or len(tasks), len(tasks)),
+        thread_name_prefix=name,
+        initializer=attach_script_ctx if ctx is not None else None
+    )
     try:
-        def format_time(ts):
-            return (datetime.utcfromtimestamp(ts) + timedelta(hours=5, minutes=30)).strftime('%H:%M')
-        
-        df = pd.DataFrame([
-            {
-                "Interval": f"{format_time(row['st'])} - {format_time(row['et'])}",
-                "Trading Zone": {
-                    "LB": "Long Buildup",
-                    "SB": "Short Buildup",
-                    "LU": "Long Unwinding",
-                    "SC": "Short Covering"
-                }.get(row["btc"], row["btc"]),
-                "Price Range": f"{row['l']:.2f} - {row['h']:.2f}",
-                "Open Interest (OI)": f"{row['toi']:,}",
-                "OI Change (%)": f"{row['oipch']:.2f}%",
-                "Fresh": f"{row['fr']:,}.00",
-                "Square-Off": f"{row['sqf']:,}.00",
-                "Traded Contracts": f"{row['vol']:,}"
-            }
-            for row in raw_data
-        ])
+        futures = {executor.submit(task): key for key, task in tasks.items()}
+        done, not_done = wait(futures, timeout=deadline)
         
-        return df
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = (None, str(e))
+        for future in not_done:
+            future.cancel()
+            results[futures[future]] = (None, f"No response within {deadline:.0f}s")
+    finally:
+        # Don't block the caller on stragglers, they are bounded by their own timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results
+
+def format_buildup_data(raw_data):
+    """Buildup records as (typed DataFrame, error); display formats come from BUILDUP_COLUMN_CONFIG"""
+    try:
+        # One pass to transpose the records into columns; everything after is array work
+        columns = {field: [row.get(field) for row in raw_data] for field in BUILDUP_RECORD_FIELDS}
+        
+        # IST wall clock minutes from epoch seconds, then labels from a lookup table
+        start = (np.array(columns['st'], dtype='int64') + IST_OFFSET_SECONDS) % 86400 // 60
+        end = (np.array(columns['et'], dtype='int64') + IST_OFFSET_SECONDS) % 86400 // 60
+        # A record without a zone stays in the table with a missing Trading Zone, and a
+        # missing count becomes NaN, so every numeric column keeps a float64 dtype
+        zones = [BUILDUP_ZONES.get(code, code) for code in columns['btc']]
+        categories = dict.fromkeys([*BUILDUP_ZONES.values(), *(zone for zone in zones if zone is not None)])
+        
+        df = pd.DataFrame({
+            "Interval": CLOCK_LABELS[start] + " - " + CLOCK_LABELS[end],
+            "Trading Zone": pd.Categorical(zones, categories=list(categories)),
+            "Low": np.array(columns['l'], dtype='float64'),
+            "High": np.array(columns['h'], dtype='float64'),
+            "Open Interest (OI)": np.array(columns['toi'], dtype='float64'),
+            "OI Change (%)": np.array(columns['oipch'], dtype='float64'),
+            "Fresh": np.array(columns['fr'], dtype='float64'),
+            "Square-Off": np.array(columns['sqf'], dtype='float64'),
+            "Traded Contracts": np.array(columns['vol'], dtype='float64'),
+        })
+        return df, None
     except Exception as e:
-        st.error(f"Error formatting buildup data: {e}")
-        return pd.DataFrame()
+        return None, f"Error formatting buildup data: {e}"
 
 def process_oi_trend_data(raw_data):
     """Process NSE OI data and filter for avgInOI > 2%"""
@@ -831,140 +1592,169 @@ def process_oi_trend_data(raw_data):
             # Filter for avgInOI > 2%
             if 'avgInOI' in df.columns:
                 filtered_df = df[df['avgInOI'] > 2.0].copy()
-                return filtered_df
+                return filtered_df, None
             else:
-                return pd.DataFrame()
+                return pd.DataFrame(), None
         else:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
     except Exception as e:
-        st.error(f"Error processing OI trend data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"Error processing OI trend data: {e}"
+
+def fetch_shortlist_sources(deadline=None, sources=None):
+    """Fetch gainers, losers and OI data concurrently under one shared deadline
+
+    Returns a dict with a (data, error) result for 'gainers', 'losers' and 'oi', or
+    only for the names in `sources` when given.
+    """
+    fetchers = {'gainers': fetch_daily_gainers, 'losers': fetch_daily_losers, 'oi': fetch_nse_data}
+    if sources is not None:
+        fetchers = {name: fetchers[name] for name in sources}
+    return run_with_deadline(fetchers, deadline or SHORTLIST_FETCH_DEADLINE, name="shortlist-fetch")
+
+def process_shortlisted_stocks(source_results=None):
+    """Process and combine data for shortlisted stocks based on criteria
+
+    Returns (df, error, warning). The OI data is required; if only one of gainers or
+    losers is available the table holds partial results and `warning` says which
+    source is missing.
+    """
+    if source_results is None:
+        source_results = fetch_shortlist_sources()
+    gainers_data, gainers_error = source_results['gainers']
+    losers_data, losers_error = source_results['losers']
+    oi_data, oi_error = source_results['oi']
+    
+    if oi_error or (gainers_error and losers_error):
+        return pd.DataFrame(), f"Error fetching data: {oi_error or gainers_error}", None
+    
+    df, error = combine_shortlisted_stocks(gainers_data, losers_data, oi_data)
+    
+    missing = []
+    if gainers_error:
+        missing.append(f"Daily Gainers ({gainers_error})")
+    if losers_error:
+        missing.append(f"Daily Losers ({losers_error})")
+    warning = f"Partial results, missing {', '.join(missing)}" if missing else None
+    
+    return df, error, warning
 
-def process_shortlisted_stocks():
-    """Process and combine data for shortlisted stocks based on criteria"""
+def combine_shortlisted_stocks(gainers_data, losers_data, oi_data):
+    """Combine already fetched gainers, losers and OI data into the shortlisted stocks"""
     try:
-        shortlisted_stocks = []
-        
-        # Fetch all three data sources
-        gainers_data, gainers_error = fetch_daily_gainers()
-        losers_data, losers_error = fetch_daily_losers()
-        oi_data, oi_error = fetch_nse_data()
-        
-        if gainers_error or losers_error or oi_error:
-            return pd.DataFrame(), f"Error fetching data: {gainers_error or losers_error or oi_error}"
-        
-        # Process OI data
-        oi_df = process_data(oi_data) if oi_data else pd.DataFrame()
-        
-        # Process gainers (>= 2% change)
-        if gainers_data:
-            gainers_df = process_gainers_data(gainers_data)
-            if not gainers_df.empty and '% Change' in gainers_df.columns:
-                filtered_gainers = gainers_df[gainers_df['% Change'] >= 2.0].copy()
-                filtered_gainers['Movement Type'] = 'Gainer'
-                
-                # Match with OI data
-                if not oi_df.empty and 'symbol' in oi_df.columns:
-                    for _, gainer in filtered_gainers.iterrows():
-                        symbol = gainer['Symbol']
-                        oi_match = oi_df[oi_df['symbol'] == symbol]
-                        if not oi_match.empty:
-                            oi_row = oi_match.iloc[0]
-                            if 'avgInOI' in oi_row and pd.notna(oi_row['avgInOI']) and oi_row['avgInOI'] > 7:
-                                combined_row = {
-                                    'Symbol': symbol,
-                                    'Company Name': gainer['Company Name'],
-                                    'LTP': gainer['LTP'],
-                                    'Change': gainer['Change'],
-                                    '% Change': gainer['% Change'],
-                                    'Volume': gainer['Volume'],
-                                    'Movement Type': 'Gainer',
-                                    'avgInOI': oi_row['avgInOI'],
-                                    'chngInOI': oi_row.get('chngInOI', 0),
-                                    'pctChngInOI': oi_row.get('pctChngInOI', 0)
-                                }
-                                shortlisted_stocks.append(combined_row)
-        
-        # Process losers (<= -2% change)
-        if losers_data:
-            losers_df = process_losers_data(losers_data)
-            if not losers_df.empty and '% Change' in losers_df.columns:
-                filtered_losers = losers_df[losers_df['% Change'] <= -2.0].copy()
-                filtered_losers['Movement Type'] = 'Loser'
-                
-                # Match with OI data
-                if not oi_df.empty and 'symbol' in oi_df.columns:
-                    for _, loser in filtered_losers.iterrows():
-                        symbol = loser['Symbol']
-                        oi_match = oi_df[oi_df['symbol'] == symbol]
-                        if not oi_match.empty:
-                            oi_row = oi_match.iloc[0]
-                            if 'avgInOI' in oi_row and pd.notna(oi_row['avgInOI']) and oi_row['avgInOI'] > 7:
-                                combined_row = {
-                                    'Symbol': symbol,
-                                    'Company Name': loser['Company Name'],
-                                    'LTP': loser['LTP'],
-                                    'Change': loser['Change'],
-                                    '% Change': loser['% Change'],
-                                    'Volume': loser['Volume'],
-                                    'Movement Type': 'Loser',
-                                    'avgInOI': oi_row['avgInOI'],
-                                    'chngInOI': oi_row.get('chngInOI', 0),
-                                    'pctChngInOI': oi_row.get('pctChngInOI', 0)
-                                }
-                                shortlisted_stocks.append(combined_row)
-        
-        # Create final DataFrame
-        if shortlisted_stocks:
-            df = pd.DataFrame(shortlisted_stocks)
+        # Process all three data sources
+        gainers_df, gainers_error = process_gainers_data(gainers_data) if gainers_data else (pd.DataFrame(), None)
+        losers_df, losers_error = process_losers_data(losers_data) if losers_data else (pd.DataFrame(), None)
+        oi_df, oi_error = process_data(oi_data) if oi_data else (pd.DataFrame(), None)
+        if oi_error or gainers_error or losers_error:
+            return pd.DataFrame(), oi_error or gainers_error or losers_error
+        
+        df = build_shortlist(gainers_df, losers_df, oi_df)
+        if not df.empty:
             df['timestamp'] = datetime.now()
-            return df, None
-        else:
-            return pd.DataFrame(), None
+        return df, None
             
     except Exception as e:
         return pd.DataFrame(), str(e)
 
-def process_oi_based_shortlisted_stocks():
-    """Process and filter stocks based on matching buildup patterns in 9:15-9:30 and 9:30-9:45 intervals"""
+def build_shortlist(gainers_df, losers_df, oi_df, min_move_pct=2.0, min_avg_oi=7):
+    """Shortlist gainers (>= 2% change) and losers (<= -2% change) with avgInOI > 7
+
+    Gainers and losers are joined with the OI data on symbol in a single vectorized
+    merge. The first OI row wins when a symbol appears more than once.
+    """
+    if oi_df.empty or 'symbol' not in oi_df.columns:
+        return pd.DataFrame()
+    
+    # One row per symbol with just the OI columns we carry over
+    oi_columns = oi_df.drop_duplicates('symbol', keep='first').reindex(columns=['symbol'] + SHORTLIST_OI_COLUMNS)
+    for column in ['chngInOI', 'pctChngInOI']:
+        if column not in oi_df.columns:
+            oi_columns[column] = 0
+    oi_columns = oi_columns[oi_columns['avgInOI'] > min_avg_oi]
+    
+    shortlisted = []
+    for movers_df, movement_type in [(gainers_df, 'Gainer'), (losers_df, 'Loser')]:
+        if movers_df.empty or '% Change' not in movers_df.columns:
+            continue
+        if movement_type == 'Gainer':
+            movers_df = movers_df[movers_df['% Change'] >= min_move_pct]
+        else:
+            movers_df = movers_df[movers_df['% Change'] <= -min_move_pct]
+        
+        matched = movers_df[SHORTLIST_MOVER_COLUMNS].merge(
+            oi_columns, left_on='Symbol', right_on='symbol', how='inner'
+        )
+        matched['Movement Type'] = movement_type
+        shortlisted.append(matched)
+    
+    if not shortlisted:
+        return pd.DataFrame()
+    
+    df = pd.concat(shortlisted, ignore_index=True)
+    if df.empty:
+        return pd.DataFrame()
+    return df[SHORTLIST_MOVER_COLUMNS + ['Movement Type'] + SHORTLIST_OI_COLUMNS]
+
+def process_oi_based_shortlisted_stocks(oi_data=None, index=None):
+    """Process and filter stocks whose buildup matches BUILDUP_PATTERN_RULE (default: same zone in 9:15-9:30 and 9:30-9:45)"""
+    if BUILDUP_RULE is None:
+        return pd.DataFrame(), BUILDUP_RULE_ERROR
     try:
         shortlisted_stocks = []
+        if index is None:
+            index = get_futures_index()
         
-        # Fetch OI trend data (stocks with avgInOI > 2%)
-        oi_data, oi_error = fetch_nse_data()
-        if oi_error:
-            return pd.DataFrame(), f"Error fetching OI data: {oi_error}"
+        # Fetch OI trend data (stocks with avgInOI > 2%) unless the caller already has it
+        if oi_data is None:
+            oi_data, oi_error = fetch_nse_data()
+            if oi_error:
+                return pd.DataFrame(), f"Error fetching OI data: {oi_error}"
         
         # Process OI data to get filtered stocks
-        oi_df = process_oi_trend_data(oi_data) if oi_data else pd.DataFrame()
+        oi_df, oi_error = process_oi_trend_data(oi_data) if oi_data else (pd.DataFrame(), None)
+        if oi_error:
+            return pd.DataFrame(), oi_error
         
         if oi_df.empty or 'symbol' not in oi_df.columns:
             return pd.DataFrame(), "No OI trend data available"
         
-        # For each stock in OI trend, check buildup patterns
+        # Resolve secids for every stock in OI trend
+        candidates = []
         for _, stock_row in oi_df.iterrows():
             symbol = stock_row['symbol']
             
             # Get secid for the symbol
-            secid = get_secid_for_symbol(symbol, st.session_state.futstk_mapping)
-            if not secid:
-                continue
-            
-            # Fetch buildup data
-            buildup_raw, buildup_error = fetch_buildup_data(secid)
-            if buildup_error or not buildup_raw:
+            secid, _ = get_secid_for_symbol(symbol, index)
+            if secid:
+                candidates.append((symbol, secid, stock_row))
+        
+        # Fetch buildup data for all candidates concurrently
+        buildup_results = fetch_buildup_data_concurrently([secid for _, secid, _ in candidates])
+        
+        # Stack the session slot codes of every stock with buildup data
+        store = get_buildup_store()
+        fetched = []
+        for symbol, secid, stock_row in candidates:
+            buildup_raw, buildup_error = buildup_results.get(secid, (None, "Not fetched"))
+            slot_codes = store.slot_codes(secid)
+            if buildup_error or not buildup_raw or slot_codes is None:
                 continue
-            
-            # Check for matching patterns in 9:15-9:30 and 9:30-9:45 intervals
-            matching_pattern = check_matching_buildup_patterns(buildup_raw)
-            if matching_pattern:
+            fetched.append((symbol, stock_row, slot_codes))
+        
+        # Evaluate the pattern rule for all of them at once
+        if fetched:
+            rule = BUILDUP_RULE
+            matched, first_slots, codes = rule.evaluate(np.stack([slot_codes for _, _, slot_codes in fetched]))
+            for (symbol, stock_row, _), is_match, first_slot, code in zip(fetched, matched, first_slots, codes):
+                if not is_match:
+                    continue
                 combined_row = {
                     'Symbol': symbol,
                     'avgInOI': stock_row.get('avgInOI', 0),
                     'chngInOI': stock_row.get('chngInOI', 0),
                     'pctChngInOI': stock_row.get('pctChngInOI', 0),
-                    'Buildup Pattern': matching_pattern,
-                    'Pattern Intervals': '9:15-9:30 & 9:30-9:45'
+                    'Buildup Pattern': BUILDUP_ZONE_NAMES[code],
+                    'Pattern Intervals': rule.describe(first_slot)
                 }
                 shortlisted_stocks.append(combined_row)
         
@@ -979,48 +1769,910 @@ def process_oi_based_shortlisted_stocks():
     except Exception as e:
         return pd.DataFrame(), str(e)
 
-def check_matching_buildup_patterns(buildup_raw):
-    """Check if 9:15-9:30 and 9:30-9:45 intervals have matching buildup patterns"""
+def check_matching_buildup_patterns(buildup_raw, rule=None):
+    """Pattern name if one symbol's buildup rows match `rule` (default: BUILDUP_PATTERN_RULE)"""
     try:
-        if not buildup_raw or len(buildup_raw) < 2:
+        if not buildup_raw:
             return None
         
-        # Convert timestamps and find the target intervals
-        interval_915_930 = None
-        interval_930_945 = None
-        
-        for row in buildup_raw:
-            start_time = datetime.utcfromtimestamp(row['st']) + timedelta(hours=5, minutes=30)
-            end_time = datetime.utcfromtimestamp(row['et']) + timedelta(hours=5, minutes=30)
-            
-            start_str = start_time.strftime('%H:%M')
-            end_str = end_time.strftime('%H:%M')
-            
-            # Check for 9:15-9:30 interval
-            if start_str == '09:15' and end_str == '09:30':
-                interval_915_930 = row['btc']
-            # Check for 9:30-9:45 interval
-            elif start_str == '09:30' and end_str == '09:45':
-                interval_930_945 = row['btc']
-        
-        # Check if we have both intervals and they match
-        if interval_915_930 and interval_930_945 and interval_915_930 == interval_930_945:
-            pattern_map = {
-                'LB': 'Long Buildup',
-                'SB': 'Short Buildup', 
-                'LU': 'Long Unwinding',
-                'SC': 'Short Covering'
-            }
-            return pattern_map.get(interval_915_930, interval_915_930)
+        rule = rule or BUILDUP_RULE
+        if rule is None:
+            return None
+        slots = fill_buildup_slots(np.zeros(SESSION_SLOTS, dtype='int8'), buildup_raw)
+        matched, _, codes = rule.evaluate(slots[np.newaxis, :])
+        return BUILDUP_ZONE_NAMES[codes[0]] if matched[0] else None
         
+    except Exception as e:
         return None
-        
+
+def session_slots(epoch_seconds):
+    """Session slot index (0 = 09:15-09:30 IST) of interval start times; -1 when off the grid"""
+    seconds = (np.asarray(epoch_seconds, dtype='int64') + IST_OFFSET_SECONDS) % 86400 - SESSION_OPEN_SECONDS
+    slots = seconds // BUILDUP_INTERVAL_SECONDS
+    on_grid = (seconds >= 0) & (seconds % BUILDUP_INTERVAL_SECONDS == 0) & (slots < SESSION_SLOTS)
+    return np.where(on_grid, slots, -1)
+
+def slot_label(slot):
+    """'HH:MM-HH:MM' IST interval of a session slot"""
+    start = (SESSION_OPEN_SECONDS + int(slot) * BUILDUP_INTERVAL_SECONDS) // 60
+    return f"{CLOCK_LABELS[start]}-{CLOCK_LABELS[start + BUILDUP_INTERVAL_SECONDS // 60]}"
+
+def fill_buildup_slots(slots, rows):
+    """Write the zone code of every complete 15 minute interval in `rows` into its session slot"""
+    if not rows:
+        return slots
+    starts = np.fromiter((row['st'] for row in rows), dtype='int64', count=len(rows))
+    ends = np.fromiter((row['et'] for row in rows), dtype='int64', count=len(rows))
+    codes = np.fromiter((BUILDUP_ZONE_CODES.get(row.get('btc'), 0) for row in rows), dtype='int8', count=len(rows))
+    
+    index = session_slots(starts)
+    complete = (index >= 0) & (ends - starts == BUILDUP_INTERVAL_SECONDS)
+    slots[index[complete]] = codes[complete]
+    return slots
+
+class BuildupRule:
+    """`length` consecutive session slots sharing one buildup zone
+
+    With `first_slot` the run must start at that slot (the classic 9:15-9:30 and
+    9:30-9:45 check is length 2 at slot 0); without it any run in the session
+    counts and the earliest one is reported. Rules are evaluated over a
+    (symbols x SESSION_SLOTS) matrix of zone codes with shifted array compares, so
+    one call covers every symbol.
+    """
+    
+    def __init__(self, length=2, first_slot=None):
+        if length < 1 or length > SESSION_SLOTS:
+            raise ValueError(f"Pattern length must be between 1 and {SESSION_SLOTS}")
+        if first_slot is not None and not 0 <= first_slot <= SESSION_SLOTS - length:
+            raise ValueError("Pattern does not fit in the session from its first slot")
+        self.length = length
+        self.first_slot = first_slot
+    
+    @classmethod
+    def parse(cls, spec):
+        """Rule from '<length>' or '<length>@<HH:MM>', e.g. '3' or '2@09:15'"""
+        length, _, start = spec.strip().partition('@')
+        if not start:
+            return cls(int(length))
+        hours, minutes = (int(part) for part in start.split(':'))
+        offset = hours * 3600 + minutes * 60 - SESSION_OPEN_SECONDS
+        if not 0 <= offset < SESSION_SLOTS * BUILDUP_INTERVAL_SECONDS:
+            raise ValueError(f"{start} is outside market hours (09:15-15:30 IST)")
+        slot = int(session_slots(SESSION_OPEN_SECONDS + offset - IST_OFFSET_SECONDS))
+        if slot < 0:
+            raise ValueError(f"{start} is not the start of a 15 minute interval")
+        return cls(int(length), slot)
+    
+    def evaluate(self, matrix):
+        """(matched, first slot, zone code) arrays with one entry per row of `matrix`"""
+        matrix = np.asarray(matrix)
+        windows = matrix.shape[1] - self.length + 1
+        first = matrix[:, :windows]
+        same = first != 0
+        for offset in range(1, self.length):
+            same &= matrix[:, offset:offset + windows] == first
+        if self.first_slot is not None:
+            anchored = np.zeros_like(same)
+            anchored[:, self.first_slot] = same[:, self.first_slot]
+            same = anchored
+        
+        matched = same.any(axis=1)
+        first_slots = same.argmax(axis=1)
+        codes = np.where(matched, first[np.arange(len(matrix)), first_slots], 0)
+        return matched, first_slots, codes
+    
+    def describe(self, first_slot):
+        """Intervals covered by a match starting at `first_slot`"""
+        return ' & '.join(slot_label(slot) for slot in range(first_slot, first_slot + self.length))
+    
+    def summary(self):
+        if self.first_slot is None:
+            return f"in {self.length} consecutive intervals"
+        return f"in {self.describe(self.first_slot)}"
+
+def parse_buildup_pattern_rule(spec):
+    """(BuildupRule, error) for a BUILDUP_PATTERN_RULE value"""
+    try:
+        return BuildupRule.parse(spec), None
+    except ValueError as e:
+        return None, f"Invalid BUILDUP_PATTERN_RULE '{spec}': {e}"
+
+# Parsed once; a bad value turns the OI based shortlist into this configuration error
+BUILDUP_RULE, BUILDUP_RULE_ERROR = parse_buildup_pattern_rule(BUILDUP_PATTERN_RULE)
+
+class Snapshot:
+    """Immutable result of one collector poll for a source
+
+    When a poll fails after an earlier one succeeded, the snapshot keeps the last
+    good `data`, `version` and `timestamp` and only sets `error`, so it is served
+    as stale data instead of an empty section.
+    """
+    
+    __slots__ = ('source', 'version', 'timestamp', 'checked_at', 'data', 'error', 'warning')
+    
+    def __init__(self, source, version, timestamp, data=None, error=None, warning=None, checked_at=None):
+        self.source = source
+        self.version = version
+        self.timestamp = timestamp  # When `data` was fetched
+        self.checked_at = checked_at or timestamp  # Last poll that confirmed `data` unchanged
+        self.data = data
+        self.error = error  # Set when the latest poll failed
+        self.warning = warning  # Set when `data` only holds partial results
+    
+    def age_seconds(self):
+        return (datetime.now() - self.checked_at).total_seconds()
+    
+    def is_stale(self):
+        return self.error is not None or self.age_seconds() > 2 * COLLECTOR_MAX_POLL_INTERVAL
+
+class SnapshotHistory:
+    """Fixed-capacity columnar ring buffer of one source's snapshots
+
+    Numeric columns live in preallocated float64 arrays indexed by snapshot slot and
+    symbol id, so OI and volume counts stay exact; text columns are not kept. The
+    first `view_window` slots are also written after the last one, so the last N
+    snapshots are one contiguous row range whenever N <= view_window and series()
+    returns read-only views instead of copies. The collector only writes rows
+    outside such a view for the next capacity - N appends; when the symbol axis
+    grows the view keeps the old buffer.
+    """
+    
+    def __init__(self, symbol_column, capacity=HISTORY_CAPACITY, symbol_capacity=64, view_window=HISTORY_VIEW_WINDOW):
+        self.symbol_column = symbol_column
+        self.capacity = capacity
+        self.view_window = min(view_window, capacity)
+        self.count = 0  # Snapshots appended since start, including overwritten ones
+        self.latest = None  # Most recent Snapshot, its frame is shared, not copied
+        self.symbols = []
+        self.symbol_ids = {}
+        self._symbol_capacity = symbol_capacity
+        self._timestamps = np.zeros(capacity + self.view_window, dtype='datetime64[ms]')
+        self._columns = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return min(self.count, self.capacity)
+    
+    @property
+    def nbytes(self):
+        return self._timestamps.nbytes + sum(buffer.nbytes for buffer in self._columns.values())
+    
+    def append(self, snapshot):
+        """Record the numeric columns of a snapshot once per version; False if skipped"""
+        df = snapshot.data
+        if df is None or df.empty or self.symbol_column not in df.columns:
+            return False
+        if self.latest is not None and self.latest.version == snapshot.version:
+            return False
+        
+        self._write(df, np.array([snapshot.timestamp], dtype='datetime64[ms]'), np.zeros(len(df), dtype=np.intp))
+        self.latest = snapshot
+        return True
+    
+    def load(self, df, timestamp_column):
+        """Bulk-append the rows of many snapshots, one per distinct `timestamp_column` value
+
+        Returns the number of snapshots written; only the newest `capacity` are kept.
+        """
+        if df.empty or self.symbol_column not in df.columns or timestamp_column not in df.columns:
+            return 0
+        times, order = np.unique(df[timestamp_column].to_numpy(dtype='datetime64[ms]'), return_inverse=True)
+        skipped = max(len(times) - self.capacity, 0)
+        if skipped:
+            keep = order >= skipped
+            df, times, order = df[keep], times[skipped:], order[keep] - skipped
+        self._write(df, times, order)
+        return len(times)
+    
+    def _write(self, df, times, order):
+        """Write `df` into the next len(times) slots; row i belongs to snapshot order[i]"""
+        numeric = df.select_dtypes('number')
+        values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        with self._lock:
+            ids = self._assign_ids(df[self.symbol_column].astype(str))
+            slots = (self.count + np.arange(len(times))) % self.capacity
+            mirrored = slots < self.view_window
+            rows = np.concatenate([slots, slots[mirrored] + self.capacity])
+            self._timestamps[rows] = np.concatenate([times, times[mirrored]])
+            for buffer in self._columns.values():
+                buffer[rows] = np.nan
+            positions = slots[order]
+            mirrored = positions < self.view_window
+            for column, name in enumerate(numeric.columns):
+                buffer = self._columns.get(name)
+                if buffer is None:
+                    buffer = self._columns[name] = np.full((len(self._timestamps), self._symbol_capacity), np.nan)
+                buffer[positions, ids] = values[:, column]
+                buffer[positions[mirrored] + self.capacity, ids[mirrored]] = values[mirrored, column]
+            self.count += len(times)
+    
+    def _assign_ids(self, symbols):
+        """Symbol ids for a column of symbols, growing the symbol axis by half when it is full"""
+        codes, uniques = pd.factorize(symbols)
+        ids = np.empty(len(uniques), dtype=np.intp)
+        for code, symbol in enumerate(uniques):
+            symbol_id = self.symbol_ids.get(symbol)
+            if symbol_id is None:
+                symbol_id = self.symbol_ids[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            ids[code] = symbol_id
+        if len(self.symbols) > self._symbol_capacity:
+            while len(self.symbols) > self._symbol_capacity:
+                self._symbol_capacity += self._symbol_capacity // 2
+            for name, buffer in self._columns.items():
+                grown = np.full((len(self._timestamps), self._symbol_capacity), np.nan)
+                grown[:, :buffer.shape[1]] = buffer
+                self._columns[name] = grown
+        return ids[codes]
+    
+    def last_timestamp(self):
+        """Timestamp of the newest snapshot kept, or None while empty"""
+        with self._lock:
+            if not self.count:
+                return None
+            return self._timestamps[(self.count - 1) % self.capacity].astype(datetime)
+    
+    def _rows(self, n):
+        """Buffer rows of the last `n` snapshots (all kept if None), oldest first
+
+        A slice when they are contiguous, in the ring or through the mirrored slots,
+        otherwise an index array.
+        """
+        n = len(self) if n is None else max(min(n, len(self)), 0)
+        end = (self.count - 1) % self.capacity + 1 if n else 0
+        if end >= n:
+            return slice(end - n, end)
+        if n <= self.view_window:
+            return slice(self.capacity + end - n, self.capacity + end)
+        return (self.count - n + np.arange(n)) % self.capacity
+    
+    def series(self, symbol, name, n=None):
+        """Column `name` of one symbol over the last `n` snapshots (all kept if None)
+
+        Indexed by snapshot timestamp, oldest first, with NaN where the symbol was
+        absent. The values and index are read-only views of the buffers unless a
+        window longer than view_window wraps around the ring. None if the symbol
+        or column was never seen.
+        """
+        with self._lock:
+            buffer = self._columns.get(name)
+            symbol_id = self.symbol_ids.get(symbol)
+            if buffer is None or symbol_id is None:
+                return None
+            rows = self._rows(n)
+            values, timestamps = buffer[rows, symbol_id], self._timestamps[rows]
+        values.flags.writeable = timestamps.flags.writeable = False
+        return pd.Series(values, index=pd.DatetimeIndex(timestamps, name='Time'), name=symbol, copy=False)
+    
+    def frame(self, name, symbols, n=None):
+        """Column `name` of `symbols` over the last `n` snapshots as one copied DataFrame
+
+        Same layout as series(), one column per symbol; symbols never seen are left out.
+        """
+        with self._lock:
+            rows = self._rows(n)
+            buffer = self._columns.get(name)
+            ids = {symbol: self.symbol_ids[symbol] for symbol in symbols if symbol in self.symbol_ids}
+            values = {symbol: buffer[rows, symbol_id] for symbol, symbol_id in ids.items()} if buffer is not None else {}
+            return pd.DataFrame(values, index=pd.DatetimeIndex(self._timestamps[rows], name='Time'))
+
+class SnapshotStore:
+    """Versioned in-memory store holding the latest snapshot for every source
+
+    The collector thread is the only writer; dashboard reruns only read, which is
+    a single dict lookup. Every published frame is also recorded in the source's
+    SnapshotHistory and, with a `state_dir`, saved to disk so the next process can
+    serve it before its first poll (see load_saved()).
+    """
+    
+    def __init__(self, state_dir=None):
+        self._snapshots = {}
+        self._condition = threading.Condition()
+        self.histories = {source: SnapshotHistory(column) for source, column in HISTORY_SYMBOL_COLUMNS.items()}
+        self.state_dir = state_dir
+    
+    def get(self, source):
+        return self._snapshots.get(source)
+    
+    def history(self, source):
+        return self.histories[source]
+    
+    def put(self, source, data=None, error=None, warning=None):
+        with self._condition:
+            previous = self._snapshots.get(source)
+            if error and previous is not None and previous.data is not None:
+                # Keep serving the last good data, marked stale by the error
+                snapshot = Snapshot(
+                    source,
+                    version=previous.version,
+                    timestamp=previous.timestamp,
+                    data=previous.data,
+                    error=error,
+                    warning=previous.warning,
+                    checked_at=previous.checked_at
+                )
+            else:
+                snapshot = Snapshot(
+                    source,
+                    version=previous.version + 1 if previous else 1,
+                    timestamp=datetime.now(),
+                    data=data,
+                    error=error,
+                    warning=warning
+                )
+            # Recorded before it is published, so readers of this version find it in the history
+            if source in self.histories:
+                self.histories[source].append(snapshot)
+            self._snapshots[source] = snapshot
+            self._condition.notify_all()
+        if self.state_dir and data is not None and not error:
+            self._save(snapshot)
+        return snapshot
+    
+    def _path(self, source):
+        return os.path.join(self.state_dir, 'snapshots', f"{source}.parquet")
+    
+    def _save(self, snapshot):
+        """Overwrite the saved copy of a source's latest good snapshot"""
+        try:
+            table = pa.Table.from_pandas(snapshot.data)
+            metadata = {'timestamp': snapshot.timestamp.isoformat(), 'warning': snapshot.warning}
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'snapshot': json.dumps(metadata).encode()})
+            path = self._path(snapshot.source)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(table, path + '.tmp')
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            print(f"Could not save {snapshot.source} snapshot: {e}")
+    
+    def load_saved(self):
+        """Publish today's snapshots saved by a previous process; returns the sources loaded"""
+        loaded = []
+        if not self.state_dir:
+            return loaded
+        for source, history in self.histories.items():
+            try:
+                table = pq.read_table(self._path(source))
+                metadata = json.loads(table.schema.metadata[b'snapshot'])
+                timestamp = datetime.fromisoformat(metadata['timestamp'])
+            except (OSError, KeyError, TypeError, ValueError, pa.ArrowInvalid):
+                continue
+            if timestamp.date() != datetime.now().date():
+                continue
+            snapshot = Snapshot(source, 1, timestamp, data=table.to_pandas(), warning=metadata.get('warning'))
+            with self._condition:
+                self._snapshots[source] = snapshot
+                self._condition.notify_all()
+            # The archive may already have restored its rows; they are recorded
+            # there a moment before the snapshot itself is published
+            last = history.last_timestamp()
+            if last is not None and last >= timestamp - timedelta(seconds=5):
+                history.latest = snapshot
+            else:
+                history.append(snapshot)
+            loaded.append(source)
+        return loaded
+    
+    def touch(self, source):
+        """Mark a source's data as confirmed by a poll whose payload did not change
+
+        Keeps the version, so nothing is reprocessed, appended or saved, and clears
+        the error of an earlier failed poll.
+        """
+        with self._condition:
+            previous = self._snapshots.get(source)
+            if previous is None or previous.data is None:
+                return previous
+            snapshot = Snapshot(
+                source,
+                version=previous.version,
+                timestamp=previous.timestamp,
+                data=previous.data,
+                warning=previous.warning,
+                checked_at=datetime.now()
+            )
+            self._snapshots[source] = snapshot
+        return snapshot
+    
+    def wait_for(self, source, timeout):
+        """Block until `source` has a snapshot or `timeout` seconds pass"""
+        with self._condition:
+            self._condition.wait_for(lambda: source in self._snapshots, timeout=timeout)
+        return self._snapshots.get(source)
+
+class SnapshotArchive:
+    """Append-only parquet archive of every polled payload, partitioned by source and IST date
+
+    record() only queues the rows, so nothing touches the disk on the request path.
+    A background thread writes each source's queued rows as one new zstd-compressed
+    part file every `flush_interval` seconds, or sooner once `flush_rows` rows wait.
+    Layout: <root>/source=<source>/date=<YYYY-MM-DD>/part-<epoch ms>-<n>.parquet
+    """
+    
+    def __init__(self, root=ARCHIVE_DIR, flush_interval=ARCHIVE_FLUSH_INTERVAL, flush_rows=ARCHIVE_FLUSH_ROWS):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.enabled = bool(root) and pq is not None
+        self._pending = []  # (source, date, fetched_at, extra columns, rows) awaiting the writer
+        self._pending_rows = 0
+        self._sequence = 0
+        self._lock = threading.Lock()  # Guards the pending queue
+        self._flush_lock = threading.Lock()  # One writer at a time
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-archive", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+    
+    def record(self, source, rows, fetched_at=None, **columns):
+        """Queue a payload's rows, each tagged with `fetched_at` and the extra `columns`"""
+        if not self.enabled or not rows:
+            return
+        with self._lock:
+            self._pending.append((source, current_ist_date(), fetched_at or datetime.now(), columns, rows))
+            self._pending_rows += len(rows)
+            if self._pending_rows >= self.flush_rows:
+                self._wakeup.set()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Archive flush failed: {e}")
+    
+    def flush(self):
+        """Write every queued payload, one new part file per source and date"""
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        partitions = {}
+        for source, day, fetched_at, columns, rows in pending:
+            partitions.setdefault((source, day), []).extend(
+                {**row, 'fetched_at': fetched_at, **columns} for row in rows
+            )
+        with self._flush_lock:
+            for (source, day), rows in partitions.items():
+                self._write_part(self.partition_dir(source, day), pd.DataFrame.from_records(rows))
+    
+    def partition_dir(self, source, day):
+        return os.path.join(self.root, f"source={source}", f"date={day.isoformat()}")
+    
+    def _write_part(self, directory, df):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # A field that changed type between payloads is stored as text
+            for column in df.select_dtypes('object').columns:
+                df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        
+        os.makedirs(directory, exist_ok=True)
+        self._sequence += 1
+        path = os.path.join(directory, f"part-{int(time.time() * 1000)}-{self._sequence}.parquet")
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+    
+    def read(self, source, day=None):
+        """All archived rows of a source for an IST date (today by default), oldest first"""
+        directory = self.partition_dir(source, day or current_ist_date())
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.parquet')]
+        except (FileNotFoundError, NotADirectoryError):
+            return pd.DataFrame()
+        frames = [pq.read_table(os.path.join(directory, name)).to_pandas() for name in names]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values('fetched_at', kind='stable', ignore_index=True)
+
+def restore_snapshot_history(store, archive):
+    """Refill today's section histories from the archive, e.g. after a restart
+
+    Only the sections that are a plain view of one payload are rebuilt; the
+    shortlists join several sources and start empty.
+    """
+    if not archive.enabled:
+        return
+    oi_df = archive.read('oi_spurts')
+    store.history('oi_spurts').load(oi_df, 'fetched_at')
+    if 'avgInOI' in oi_df.columns:
+        store.history('oi_trend').load(oi_df[oi_df['avgInOI'] > 2.0], 'fetched_at')
+    for source in ('gainers', 'losers'):
+        store.history(source).load(archive.read(source).rename(columns=MOVERS_COLUMN_NAMES), 'fetched_at')
+
+@st.cache_resource(show_spinner=False)
+def get_snapshot_archive():
+    """Process-wide snapshot archive and its writer thread"""
+    archive = SnapshotArchive()
+    archive.start()
+    return archive
+
+def payload_digest(raw_data):
+    """Stable hash of the rows of a decoded upstream payload"""
+    rows = raw_data.get('data', raw_data) if isinstance(raw_data, dict) else raw_data
+    encoded = json.dumps(rows, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+class PollSchedule:
+    """Adaptive poll interval of one upstream endpoint, driven by payload changes
+
+    A poll whose payload hash differs from the previous one halves the interval; an
+    unchanged payload stretches it by a quarter. The interval stays within
+    [min_interval, max_interval], so polling follows how often upstream publishes.
+    """
+    
+    def __init__(self, interval=COLLECTOR_POLL_INTERVAL, min_interval=COLLECTOR_MIN_POLL_INTERVAL,
+                 max_interval=COLLECTOR_MAX_POLL_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.next_due = 0.0  # time.monotonic() of the next poll
+        self.digest = None
+        self.changes = 0
+        self.polls = 0
+    
+    def is_due(self, now):
+        return now >= self.next_due
+    
+    def observe(self, raw_data, now):
+        """Record a successful poll and schedule the next one; True if the payload changed"""
+        digest = payload_digest(raw_data)
+        changed = digest != self.digest
+        self.digest = digest
+        self.polls += 1
+        if changed:
+            self.changes += 1
+            self.interval = max(self.interval / 2, self.min_interval)
+        else:
+            self.interval = min(self.interval * 1.25, self.max_interval)
+        self.next_due = now + self.interval
+        return changed
+    
+    def failed(self, now):
+        """A failed poll keeps the interval; the circuit breaker limits retries to a failing host"""
+        self.next_due = now + self.interval
+
+class DataCollector:
+    """Background thread that polls the upstream endpoints and publishes every section
+
+    Upstream load no longer grows with the number of connected viewers. Each
+    endpoint is polled on its own PollSchedule. A section is only reprocessed, added
+    to its history and saved when one of its payloads changed; an unchanged poll
+    just confirms the current snapshot. Sources in ON_DEMAND_SOURCES are expensive
+    (one buildup call per symbol) and are only built while some dashboard session
+    has asked for them recently.
+    """
+    
+    ON_DEMAND_SOURCES = ('oi_based_shortlist',)
+    
+    # Section -> (endpoint it is built from, processing function)
+    SECTIONS = {
+        'oi_spurts': ('oi', process_data),
+        'oi_trend': ('oi', process_oi_trend_data),
+        'gainers': ('gainers', process_gainers_data),
+        'losers': ('losers', process_losers_data),
+    }
+    
+    # Archive source of each endpoint's payload
+    ARCHIVE_SOURCES = {'oi': 'oi_spurts', 'gainers': 'gainers', 'losers': 'losers'}
+    
+    def __init__(self, store, archive, interval=COLLECTOR_POLL_INTERVAL):
+        self.store = store
+        self.archive = archive
+        self.interval = interval
+        self.last_cycle_at = None
+        self.schedules = {endpoint: PollSchedule(interval) for endpoint in self.ARCHIVE_SOURCES}
+        self._payloads = {}  # endpoint -> last good decoded payload
+        self._errors = {}  # endpoint -> error of its last poll, while it keeps failing
+        self._oi_based_expires_at = None
+        self._demand = {}
+        self._force = False
+        self._wakeup = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-collector", daemon=True)
+            self._thread.start()
+    
+    def request(self, source):
+        """Mark a source as wanted; wakes the collector if it has never been polled"""
+        first_request = source not in self._demand
+        self._demand[source] = time.monotonic()
+        if first_request and self.store.get(source) is None:
+            self._wakeup.set()
+    
+    def refresh_now(self):
+        """Poll every endpoint right away, whatever its schedule"""
+        self._force = True
+        self._wakeup.set()
+    
+    def _is_demanded(self, source):
+        requested_at = self._demand.get(source)
+        return requested_at is not None and time.monotonic() - requested_at < 2 * self.interval
+    
+    def seconds_until_due(self):
+        """Time until the next endpoint poll or buildup interval that needs a cycle"""
+        now = time.monotonic()
+        wait = min(schedule.next_due for schedule in self.schedules.values()) - now
+        if self._oi_based_expires_at is not None and self._is_demanded('oi_based_shortlist'):
+            wait = min(wait, self._oi_based_expires_at - time.time())
+        return max(wait, 1)
+    
+    def _run(self):
+        while True:
+            try:
+                self.poll_cycle()
+            except Exception as e:
+                print(f"Collector cycle failed: {e}")
+            self.last_cycle_at = datetime.now()
+            self._wakeup.wait(self.seconds_until_due())
+            self._wakeup.clear()
+    
+    def poll_cycle(self):
+        """Fetch the endpoints that are due and republish only what their payloads changed"""
+        force, self._force = self._force, False
+        now = time.monotonic()
+        due = [endpoint for endpoint, schedule in self.schedules.items() if force or schedule.is_due(now)]
+        results = fetch_shortlist_sources(sources=due) if due else {}
+        
+        changed, errors = set(), {}
+        failing = set(self._errors)
+        for endpoint, (raw_data, error) in results.items():
+            schedule = self.schedules[endpoint]
+            if error:
+                schedule.failed(now)
+                errors[endpoint] = self._errors[endpoint] = error
+                continue
+            self._errors.pop(endpoint, None)
+            if schedule.observe(raw_data, now):
+                changed.add(endpoint)
+                self._payloads[endpoint] = raw_data
+                # Queue the new payload for the on-disk archive, written by its own thread
+                if raw_data:
+                    self.archive.record(self.ARCHIVE_SOURCES[endpoint], raw_data.get('data'))
+        
+        for section, (endpoint, process) in self.SECTIONS.items():
+            if endpoint in errors:
+                self.store.put(section, error=errors[endpoint])
+            elif endpoint in changed:
+                raw_data = self._payloads[endpoint]
+                df, error = process(raw_data) if raw_data else (pd.DataFrame(), None)
+                if error:
+                    self.store.put(section, error=error)
+                else:
+                    self.store.put(section, data=df)
+            elif endpoint in results:
+                self.store.touch(section)
+        
+        if results:
+            self._publish_shortlist(changed or failing != set(self._errors))
+        if self._is_demanded('oi_based_shortlist'):
+            self._publish_oi_based_shortlist('oi' in changed, 'oi' in results)
+    
+    def _publish_shortlist(self, inputs_changed):
+        """Rebuild the shortlist when a payload changed or an endpoint started or stopped failing"""
+        snapshot = self.store.get('shortlisted')
+        if inputs_changed or snapshot is None:
+            # A failing endpoint is left out, not served from its last good payload, so
+            # process_shortlisted_stocks() reports it as missing or fails on OI
+            source_results = {
+                endpoint: (None, self._errors[endpoint]) if endpoint in self._errors
+                else (self._payloads[endpoint], None) if endpoint in self._payloads
+                else (None, "Not fetched yet")
+                for endpoint in self.ARCHIVE_SOURCES
+            }
+            df, error, warning = process_shortlisted_stocks(source_results)
+            self.store.put('shortlisted', data=df, error=error, warning=warning)
+        elif not snapshot.error:
+            # Confirmed as is; a partial shortlist keeps its warning
+            self.store.touch('shortlisted')
+    
+    def _publish_oi_based_shortlist(self, oi_changed, oi_polled):
+        # The buildup data behind it also moves on at every 15 minute interval
+        interval_closed = self._oi_based_expires_at is None or time.time() >= self._oi_based_expires_at
+        if 'oi' in self._errors:
+            self.store.put('oi_based_shortlist', error=f"Error fetching OI data: {self._errors['oi']}")
+        elif 'oi' in self._payloads and (oi_changed or interval_closed or self.store.get('oi_based_shortlist') is None):
+            df, error = process_oi_based_shortlisted_stocks(self._payloads['oi'] or {}, get_futures_index())
+            self.store.put('oi_based_shortlist', data=df, error=error)
+            self._oi_based_expires_at = get_buildup_store().expiry_for(time.time())
+        elif oi_polled:
+            self.store.touch('oi_based_shortlist')
+
+@st.cache_resource(show_spinner=False)
+def get_collector():
+    """Process-wide collector and snapshot store shared by every dashboard session"""
+    archive = get_snapshot_archive()
+    if pq is None:
+        print("pyarrow is not installed; the snapshot archive and saved snapshots are disabled")
+    store = SnapshotStore(WARM_START_DIR if pq is not None else None)
+    try:
+        restore_snapshot_history(store, archive)
     except Exception as e:
+        print(f"Could not restore snapshot history from {archive.root}: {e}")
+    # Serve the last snapshots of the previous process until the first poll completes
+    store.load_saved()
+    collector = DataCollector(store, archive)
+    collector.start()
+    return collector
+
+def read_snapshot(source, status_placeholder, label):
+    """Return (snapshot, error) for a section, waiting only before the first poll completes
+
+    A snapshot still holding the last good data after failed polls is returned
+    without an error; show_snapshot_status() marks it stale with its age.
+    """
+    collector = get_collector()
+    collector.request(source)
+    snapshot = collector.store.get(source)
+    if snapshot is None:
+        with status_placeholder:
+            with st.spinner(f"Waiting for first {label} snapshot..."):
+                snapshot = collector.store.wait_for(source, timeout=COLLECTOR_FIRST_SNAPSHOT_TIMEOUT)
+    if snapshot is None:
+        return None, f"No {label} snapshot available yet"
+    if snapshot.data is None:
+        return snapshot, snapshot.error
+    return snapshot, None
+
+def format_age(seconds):
+    """Compact age such as '45s', '12m' or '2h 5m'"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+
+def show_snapshot_status(status_placeholder, snapshot):
+    """Status badge for a served snapshot: success, partial, or stale with its age"""
+    if snapshot.is_stale():
+        reason = f" · refresh failed: {snapshot.error}" if snapshot.error else ""
+        status_placeholder.warning(f"⚠️ Stale, {format_age(snapshot.age_seconds())} old{reason}")
+    elif snapshot.warning:
+        status_placeholder.warning("⚠️ Partial")
+    else:
+        status_placeholder.success("✅ Success")
+
+def snapshot_render_key(snapshot):
+    """What a section shows of a snapshot; an unchanged key needs no redraw"""
+    if snapshot is None:
         return None
+    stale_age = format_age(snapshot.age_seconds()) if snapshot.is_stale() else None
+    return snapshot.version, snapshot.error, snapshot.warning, stale_age
+
+def get_snapshot_history(source):
+    """Process-wide SnapshotHistory of a source, filled by the collector"""
+    return get_collector().store.history(source)
+
+def build_oi_spurts_chart(df):
+    top_symbols = df.nlargest(10, 'pctChngInOI')
+    fig = px.bar(
+        top_symbols,
+        x='symbol' if 'symbol' in df.columns else df.index,
+        y='pctChngInOI',
+        title="Top 10 OI % Changes",
+        labels={'pctChngInOI': 'OI % Change', 'symbol': 'Symbol'}
+    )
+    fig.update_layout(height=300, margin=dict(t=40, b=20))
+    return fig
+
+def build_movers_chart(top_movers, title, color_scale):
+    fig = px.bar(
+        top_movers,
+        x='Symbol',
+        y='% Change',
+        title=title,
+        labels={'% Change': '% Change', 'Symbol': 'Symbol'},
+        color='% Change',
+        color_continuous_scale=color_scale
+    )
+    fig.update_layout(height=300, margin=dict(t=40, b=20))
+    return fig
+
+def build_shortlist_scatter(df):
+    fig = px.scatter(
+        df,
+        x='% Change',
+        y='avgInOI',
+        color='Movement Type',
+        title="% Change vs Average OI",
+        hover_data=['Symbol', 'Company Name'],
+        color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+def build_shortlist_bar(df):
+    top_oi = df.nlargest(10, 'avgInOI')
+    fig = px.bar(
+        top_oi,
+        x='Symbol',
+        y='avgInOI',
+        color='Movement Type',
+        title="Top 10 by Average OI",
+        color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+def build_trend_chart(source, symbols, column, title, label):
+    """Line per symbol of a column over the session, read from the source's SnapshotHistory"""
+    trend = get_snapshot_history(source).frame(column, list(symbols))
+    fig = px.line(trend, title=title, labels={'value': label, 'variable': 'Symbol'})
+    fig.update_layout(height=300, margin=dict(t=40, b=20))
+    return fig
+
+SNAPSHOT_CHARTS = {
+    'oi_spurts': build_oi_spurts_chart,
+    'oi_spurts_trend': lambda df: build_trend_chart(
+        'oi_spurts', df.nlargest(5, 'pctChngInOI')['symbol'], 'pctChngInOI', "Top 5 OI % Changes Through the Session", 'OI % Change'),
+    'gainers': lambda df: build_movers_chart(df.nlargest(10, '% Change'), "Top 10 Daily Gainers", 'Greens'),
+    'gainers_trend': lambda df: build_trend_chart(
+        'gainers', df.nlargest(5, '% Change')['Symbol'], '% Change', "Top 5 Gainers Through the Session", '% Change'),
+    'losers': lambda df: build_movers_chart(df.nsmallest(10, '% Change'), "Top 10 Daily Losers", 'Reds'),
+    'losers_trend': lambda df: build_trend_chart(
+        'losers', df.nsmallest(5, '% Change')['Symbol'], '% Change', "Top 5 Losers Through the Session", '% Change'),
+    'shortlisted_scatter': build_shortlist_scatter,
+    'shortlisted_bar': build_shortlist_bar,
+}
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def get_snapshot_chart(chart, version, _df):
+    """Figure for one snapshot version, shared by every rerun and session until the data changes"""
+    return SNAPSHOT_CHARTS[chart](_df)
+
+def render_symbol_picker():
+    """Sidebar type-ahead that opens the detail page of any F&O symbol"""
+    st.sidebar.markdown("---")
+    query = st.sidebar.text_input("🔎 Jump to F&O symbol", key="symbol_search_query",
+                                  placeholder="e.g. RELI or BANK")
+    if not query:
+        return
+    
+    matches = get_futures_index().search_index.search(query)
+    if not matches:
+        st.sidebar.caption("No matching symbols")
+        return
+    for symbol in matches:
+        if st.sidebar.button(symbol, key=f"symbol_search_{symbol}", use_container_width=True,
+                             type="primary" if symbol == st.session_state.selected_stock_symbol else "secondary"):
+            st.session_state.selected_stock_symbol = symbol
+            st.session_state.show_stock_detail_page = True
+            st.session_state.buildup_data = None
+            st.rerun()
+
+def render_symbol_history(symbol):
+    """Open interest of a symbol across today's OI Spurts snapshots, if it has been in them"""
+    trend = get_snapshot_history('oi_spurts').series(symbol, 'latestOI')
+    if trend is None or trend.count() < 2:
+        return
+    trend = trend.dropna()
+    
+    st.markdown("### 🕒 OI Through the Session")
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        first_oi, latest_oi = trend.iloc[0], trend.iloc[-1]
+        st.metric("Open Interest", f"{latest_oi:,.0f}", f"{latest_oi - first_oi:+,.0f} since {trend.index[0]:%H:%M}")
+    
+    with col2:
+        fig = px.line(trend.to_frame(), y=symbol, labels={symbol: 'Open Interest'}, markers=True)
+        fig.update_layout(height=250, margin=dict(t=20, b=20), showlegend=False)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("---")
 
 def show_stock_detail_page():
     """Show detailed tabular data for the selected stock"""
     st.title(f"📊 Stock Details: {st.session_state.selected_stock_symbol}")
+    render_symbol_picker()
     
     # Back button
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -1041,15 +2693,17 @@ def show_stock_detail_page():
         with btn_col1:
             if st.button("🔄 Refresh Data", type="secondary", use_container_width=True):
                 # Refresh the buildup data
-                secid = get_secid_for_symbol(st.session_state.selected_stock_symbol, st.session_state.futstk_mapping)
+                secid, secid_error = get_secid_for_symbol(st.session_state.selected_stock_symbol, get_futures_index())
+                if secid_error:
+                    st.error(secid_error)
                 if secid:
                     with st.spinner(f"Refreshing buildup data for {st.session_state.selected_stock_symbol}..."):
-                        buildup_raw, error = fetch_buildup_data(secid)
+                        buildup_raw, error = get_buildup_data(secid)
                         if error:
                             st.error(f"Error fetching buildup data: {error}")
                             st.session_state.buildup_data = None
                         else:
-                            formatted_data = format_buildup_data(buildup_raw)
+                            formatted_data = get_buildup_store().formatted(secid)
                             st.session_state.buildup_data = formatted_data
                     st.rerun()
         
@@ -1069,6 +2723,8 @@ def show_stock_detail_page():
     
     st.markdown("---")
     
+    render_symbol_history(st.session_state.selected_stock_symbol)
+    
     # Display the buildup data
     if st.session_state.buildup_data is not None:
         if not st.session_state.buildup_data.empty:
@@ -1080,19 +2736,20 @@ def show_stock_detail_page():
                 st.metric("Total Intervals", total_intervals)
             
             with col2:
-                if 'OI Change' in st.session_state.buildup_data.columns:
-                    avg_oi_change = st.session_state.buildup_data['OI Change'].mean()
-                    st.metric("Avg OI Change", f"{avg_oi_change:.0f}")
+                if 'OI Change (%)' in st.session_state.buildup_data.columns:
+                    avg_oi_change = st.session_state.buildup_data['OI Change (%)'].mean()
+                    st.metric("Avg OI Change", f"{avg_oi_change:.2f}%")
             
             with col3:
-                if 'Volume' in st.session_state.buildup_data.columns:
-                    total_volume = st.session_state.buildup_data['Volume'].sum()
-                    st.metric("Total Volume", f"{total_volume:.0f}")
+                if 'Traded Contracts' in st.session_state.buildup_data.columns:
+                    total_volume = st.session_state.buildup_data['Traded Contracts'].sum()
+                    st.metric("Total Volume", f"{total_volume:,.0f}")
             
             with col4:
-                if 'Price Change' in st.session_state.buildup_data.columns:
-                    avg_price_change = st.session_state.buildup_data['Price Change'].mean()
-                    st.metric("Avg Price Change", f"{avg_price_change:.2f}")
+                if {'Low', 'High'} <= set(st.session_state.buildup_data.columns):
+                    day_low = st.session_state.buildup_data['Low'].min()
+                    day_high = st.session_state.buildup_data['High'].max()
+                    st.metric("Day Range", f"{day_low:.2f} - {day_high:.2f}")
             
             st.markdown("### 📈 Detailed Buildup Data")
             
@@ -1100,7 +2757,8 @@ def show_stock_detail_page():
             st.dataframe(
                 st.session_state.buildup_data,
                 use_container_width=True,
-                height=600
+                height=600,
+                column_config=BUILDUP_COLUMN_CONFIG
             )
             
             # Add charts if data is available
@@ -1110,11 +2768,11 @@ def show_stock_detail_page():
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    if 'OI Change' in st.session_state.buildup_data.columns:
+                    if 'OI Change (%)' in st.session_state.buildup_data.columns:
                         fig_oi = px.line(
                             st.session_state.buildup_data,
                             x='Interval',
-                            y='OI Change',
+                            y='OI Change (%)',
                             title="OI Change Over Time",
                             markers=True
                         )
@@ -1122,11 +2780,11 @@ def show_stock_detail_page():
                         st.plotly_chart(fig_oi, use_container_width=True)
                 
                 with col2:
-                    if 'Volume' in st.session_state.buildup_data.columns:
+                    if 'Traded Contracts' in st.session_state.buildup_data.columns:
                         fig_vol = px.bar(
                             st.session_state.buildup_data,
                             x='Interval',
-                            y='Volume',
+                            y='Traded Contracts',
                             title="Volume Distribution"
                         )
                         fig_vol.update_layout(height=400)
@@ -1142,19 +2800,19 @@ def show_stock_detail_page():
     else:
         st.info(f"Loading buildup data for {st.session_state.selected_stock_symbol}...")
         # Auto-fetch data if not available
-        secid = get_secid_for_symbol(st.session_state.selected_stock_symbol, st.session_state.futstk_mapping)
+        secid, secid_error = get_secid_for_symbol(st.session_state.selected_stock_symbol, get_futures_index())
         if secid:
             with st.spinner(f"Fetching buildup data for {st.session_state.selected_stock_symbol}..."):
-                buildup_raw, error = fetch_buildup_data(secid)
+                buildup_raw, error = get_buildup_data(secid)
                 if error:
                     st.error(f"Error fetching buildup data: {error}")
                     st.session_state.buildup_data = None
                 else:
-                    formatted_data = format_buildup_data(buildup_raw)
+                    formatted_data = get_buildup_store().formatted(secid)
                     st.session_state.buildup_data = formatted_data
             st.rerun()
         else:
-            st.error(f"No secid found for {st.session_state.selected_stock_symbol} in July 2025 futures")
+            st.error(secid_error)
 
 def main():
     # Check if we should show stock detail page
@@ -1178,54 +2836,6 @@ def main():
     </style>
     """, unsafe_allow_html=True)
     
-    # Title with inline metrics and refresh button
-    title_col1, title_col2, title_col3, title_col4 = st.columns([3, 1, 1, 1])
-    
-    with title_col1:
-        if st.session_state.selected_section == "OI Spurts":
-            st.markdown("### 📈 NSE OI Spurts Live Dashboard")
-        elif st.session_state.selected_section == "Daily Gainers":
-            st.markdown("### 🚀 Daily Gainers F&O Stocks Dashboard")
-        elif st.session_state.selected_section == "Daily Losers":
-            st.markdown("### 📉 Daily Losers F&O Stocks Dashboard")
-        elif st.session_state.selected_section == "OI Trend":
-            st.markdown("### 📊 OI TREND - Live NSE OI Spurts (avgInOI > 2%)")
-        else:
-            st.markdown("### ⭐ Shortlisted Stocks Dashboard")
-    
-    with title_col2:
-        symbols_placeholder = st.empty()
-    
-    with title_col3:
-        updated_placeholder = st.empty()
-    
-    with title_col4:
-        col_refresh, col_session = st.columns(2)
-        
-        with col_refresh:
-            if st.button("🔄 Refresh", type="primary", use_container_width=True):
-                # Clear the appropriate data history to force refresh
-                if st.session_state.selected_section == "OI Spurts":
-                    st.session_state.data_history = []
-                elif st.session_state.selected_section == "Daily Gainers":
-                    st.session_state.gainers_data_history = []
-                elif st.session_state.selected_section == "Daily Losers":
-                    st.session_state.losers_data_history = []
-                elif st.session_state.selected_section == "OI Trend":
-                    st.session_state.oi_trend_data_history = []
-                else:
-                    st.session_state.shortlisted_data_history = []
-                st.rerun()
-        
-        with col_session:
-            if st.button("🔄 Session", help="Refresh NSE session", use_container_width=True):
-                refresh_nse_session()
-                success_placeholder = st.empty()
-                success_placeholder.success("Session refreshed!")
-                time.sleep(1)
-                success_placeholder.empty()
-                st.rerun()
-    
     # Sidebar - Section selection
     st.sidebar.header("📊 Dashboard Sections")
     
@@ -1254,6 +2864,8 @@ def main():
         st.session_state.selected_section = "OI Based Shortlist"
         st.rerun()
     
+    render_symbol_picker()
+    
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**Current Section:** {st.session_state.selected_section}")
     
@@ -1261,18 +2873,25 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Session Status:**")
     
-    if st.session_state.nse_session_established and st.session_state.session_creation_time:
-        session_age = (datetime.now() - st.session_state.session_creation_time).seconds
-        session_age_minutes = session_age // 60
+    nse_session = get_upstream_sessions()['nse']
+    session_age = nse_session.age_seconds()
+    if session_age is not None:
+        session_age_minutes = int(session_age // 60)
         
-        if session_age < 30 * 60:  # Less than 30 minutes
+        if session_age < UPSTREAM_SESSION_MAX_AGE:
             st.sidebar.success(f"✅ Active ({session_age_minutes}m old)")
         else:
             st.sidebar.warning(f"⚠️ Aging ({session_age_minutes}m old)")
             
-        st.sidebar.caption(f"Created: {st.session_state.session_creation_time.strftime('%H:%M:%S')}")
+        st.sidebar.caption(f"Created: {nse_session.created_at.strftime('%H:%M:%S')} (shared)")
     else:
         st.sidebar.error("❌ No active session")
+    
+    # Upstream hosts whose circuit breaker is refusing calls
+    for session in get_upstream_sessions().values():
+        if session.breaker.state != CircuitBreaker.CLOSED:
+            st.sidebar.warning(f"🔌 {session.host}: paused after {session.breaker.failures} failures, "
+                               f"next attempt in {session.breaker.retry_in():.0f}s")
         
     if st.sidebar.button("🔄 Refresh Session", use_container_width=True):
         with st.sidebar:
@@ -1293,6 +2912,88 @@ def main():
     # Keep auto-refresh functionality but without UI control
     auto_refresh = st.session_state.auto_refresh
     
+    render_section_data()
+    
+    # Only a snapshot check runs on the timer; idle sessions hold no script thread in between
+    # and the section is redrawn once per new snapshot instead of once per interval
+    if auto_refresh:
+        st.fragment(watch_section_snapshot, run_every=AUTO_REFRESH_INTERVAL)()
+
+# Collector source shown by each section, the OI Based Shortlist is the default
+SECTION_SOURCES = {
+    "OI Spurts": 'oi_spurts',
+    "Daily Gainers": 'gainers',
+    "Daily Losers": 'losers',
+    "OI Trend": 'oi_trend',
+    "Shortlisted Stocks": 'shortlisted',
+}
+
+def watch_section_snapshot():
+    """Rerun the page when the selected section's snapshot differs from the rendered one"""
+    section = st.session_state.selected_section
+    source = SECTION_SOURCES.get(section, 'oi_based_shortlist')
+    collector = get_collector()
+    # Keeps the source demanded, the collector stops polling sources nobody reads
+    collector.request(source)
+    if st.session_state.get('rendered_snapshot_key') != (section, snapshot_render_key(collector.store.get(source))):
+        st.rerun()
+
+def render_title_row():
+    """Title row with the section's inline metrics and refresh buttons
+
+    Returns the (symbols, updated) metric placeholders.
+    """
+    title_col1, title_col2, title_col3, title_col4 = st.columns([3, 1, 1, 1])
+    
+    with title_col1:
+        if st.session_state.selected_section == "OI Spurts":
+            st.markdown("### 📈 NSE OI Spurts Live Dashboard")
+        elif st.session_state.selected_section == "Daily Gainers":
+            st.markdown("### 🚀 Daily Gainers F&O Stocks Dashboard")
+        elif st.session_state.selected_section == "Daily Losers":
+            st.markdown("### 📉 Daily Losers F&O Stocks Dashboard")
+        elif st.session_state.selected_section == "OI Trend":
+            st.markdown("### 📊 OI TREND - Live NSE OI Spurts (avgInOI > 2%)")
+        else:
+            st.markdown("### ⭐ Shortlisted Stocks Dashboard")
+    
+    with title_col2:
+        symbols_placeholder = st.empty()
+    
+    with title_col3:
+        updated_placeholder = st.empty()
+    
+    with title_col4:
+        col_refresh, col_session = st.columns(2)
+        
+        with col_refresh:
+            if st.button("🔄 Refresh", type="primary", use_container_width=True):
+                # Ask the background collector to poll upstream right away
+                get_collector().refresh_now()
+                st.rerun()
+        
+        with col_session:
+            if st.button("🔄 Session", help="Refresh NSE session", use_container_width=True):
+                refresh_nse_session()
+                success_placeholder = st.empty()
+                success_placeholder.success("Session refreshed!")
+                time.sleep(1)
+                success_placeholder.empty()
+                st.rerun()
+    
+    return symbols_placeholder, updated_placeholder
+
+def render_section_data():
+    """Render the title row, status, data table and charts for the selected section
+
+    With auto-refresh on, the rendered snapshot is remembered in the session state so
+    watch_section_snapshot() only reruns the page once a newer snapshot is served.
+    """
+    auto_refresh = st.session_state.auto_refresh
+    
+    # Title with inline metrics and refresh button
+    symbols_placeholder, updated_placeholder = render_title_row()
+    
     # Compact status area
     col1, col2 = st.columns([3, 1])
     
@@ -1309,37 +3010,25 @@ def main():
     # Auto-refresh logic based on selected section
     if auto_refresh:
         if st.session_state.selected_section == "OI Spurts":
-            # Fetch NSE OI Spurts data
-            with status_placeholder:
-                with st.spinner("Fetching OI Spurts data..."):
-                    data, error = fetch_nse_data()
+            # Read the latest OI Spurts snapshot from the collector
+            snapshot, error = read_snapshot('oi_spurts', status_placeholder, "OI Spurts")
             
             if error:
                 st.error(f"Error fetching data: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                st.session_state.last_update = snapshot.timestamp
                 
-                # Process and display data
-                if data:
-                    df = process_data(data)
+                # Display data
+                if snapshot.data is not None:
+                    df = snapshot.data
                     
                     if not df.empty:
-                        # Store in history
-                        st.session_state.data_history.append({
-                            'timestamp': datetime.now(),
-                            'data': df
-                        })
-                        
-                        # Keep only last 10 data points
-                        if len(st.session_state.data_history) > 10:
-                            st.session_state.data_history = st.session_state.data_history[-10:]
-                        
                         # Update title row metrics
                         if len(df) > 0:
                             symbols_placeholder.metric("Symbols", len(df))
-                            current_time = datetime.now().strftime("%H:%M:%S")
+                            current_time = snapshot.timestamp.strftime("%H:%M:%S")
                             updated_placeholder.metric("Updated", current_time)
                         
                         # Display current data
@@ -1366,58 +3055,43 @@ def main():
                             )
                         
                         # Compact charts section
-                        if len(st.session_state.data_history) > 1:
+                        if len(get_snapshot_history('oi_spurts')) > 1:
                             with chart_placeholder.container():
                                 # Create trend chart if we have numeric data
                                 if 'pctChngInOI' in df.columns and pd.api.types.is_numeric_dtype(df['pctChngInOI']):
-                                    # Top 10 symbols by percentage change
-                                    top_symbols = df.nlargest(10, 'pctChngInOI')
-                                    
-                                    fig = px.bar(
-                                        top_symbols,
-                                        x='symbol' if 'symbol' in df.columns else df.index,
-                                        y='pctChngInOI',
-                                        title="Top 10 OI % Changes",
-                                        labels={'pctChngInOI': 'OI % Change', 'symbol': 'Symbol'}
-                                    )
-                                    fig.update_layout(height=300, margin=dict(t=40, b=20))
-                                    st.plotly_chart(fig, use_container_width=True)
+                                    col1, col2 = st.columns(2)
+                                    with col1:
+                                        # Top 10 symbols by percentage change
+                                        fig = get_snapshot_chart('oi_spurts', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
+                                    with col2:
+                                        # The same change over the session for the top 5, from the history
+                                        fig = get_snapshot_chart('oi_spurts_trend', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
                     
                     else:
                         st.warning("No data available in the response")
         
         elif st.session_state.selected_section == "Daily Gainers":
-            # Fetch Daily Gainers data
-            with status_placeholder:
-                with st.spinner("Fetching Daily Gainers data..."):
-                    data, error = fetch_daily_gainers()
+            # Read the latest Daily Gainers snapshot from the collector
+            snapshot, error = read_snapshot('gainers', status_placeholder, "Daily Gainers")
             
             if error:
                 st.error(f"Error fetching gainers data: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.gainers_last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                st.session_state.gainers_last_update = snapshot.timestamp
                 
-                # Process and display data
-                if data:
-                    df = process_gainers_data(data)
+                # Display data
+                if snapshot.data is not None:
+                    df = snapshot.data
                     
                     if not df.empty:
-                        # Store in history
-                        st.session_state.gainers_data_history.append({
-                            'timestamp': datetime.now(),
-                            'data': df
-                        })
-                        
-                        # Keep only last 10 data points
-                        if len(st.session_state.gainers_data_history) > 10:
-                            st.session_state.gainers_data_history = st.session_state.gainers_data_history[-10:]
-                        
                         # Update title row metrics
                         if len(df) > 0:
                             symbols_placeholder.metric("Gainers", len(df))
-                            current_time = datetime.now().strftime("%H:%M:%S")
+                            current_time = snapshot.timestamp.strftime("%H:%M:%S")
                             updated_placeholder.metric("Updated", current_time)
                         
                         # Display current data
@@ -1433,60 +3107,43 @@ def main():
                             )
                         
                         # Compact charts section
-                        if len(st.session_state.gainers_data_history) > 1:
+                        if len(get_snapshot_history('gainers')) > 1:
                             with chart_placeholder.container():
                                 # Create trend chart if we have numeric data
                                 if '% Change' in df.columns and pd.api.types.is_numeric_dtype(df['% Change']):
-                                    # Top 10 gainers by percentage change
-                                    top_gainers = df.nlargest(10, '% Change')
-                                    
-                                    fig = px.bar(
-                                        top_gainers,
-                                        x='Symbol',
-                                        y='% Change',
-                                        title="Top 10 Daily Gainers",
-                                        labels={'% Change': '% Change', 'Symbol': 'Symbol'},
-                                        color='% Change',
-                                        color_continuous_scale='Greens'
-                                    )
-                                    fig.update_layout(height=300, margin=dict(t=40, b=20))
-                                    st.plotly_chart(fig, use_container_width=True)
+                                    col1, col2 = st.columns(2)
+                                    with col1:
+                                        # Top 10 gainers by percentage change
+                                        fig = get_snapshot_chart('gainers', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
+                                    with col2:
+                                        # Their % change over the session, from the history
+                                        fig = get_snapshot_chart('gainers_trend', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
                     
                     else:
                         st.warning("No gainers data available in the response")
         
         elif st.session_state.selected_section == "Daily Losers":
-            # Fetch Daily Losers data
-            with status_placeholder:
-                with st.spinner("Fetching Daily Losers data..."):
-                    data, error = fetch_daily_losers()
+            # Read the latest Daily Losers snapshot from the collector
+            snapshot, error = read_snapshot('losers', status_placeholder, "Daily Losers")
             
             if error:
                 st.error(f"Error fetching losers data: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.losers_last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                st.session_state.losers_last_update = snapshot.timestamp
                 
-                # Process and display data
-                if data:
-                    df = process_losers_data(data)
+                # Display data
+                if snapshot.data is not None:
+                    df = snapshot.data
                     
                     if not df.empty:
-                        # Store in history
-                        st.session_state.losers_data_history.append({
-                            'timestamp': datetime.now(),
-                            'data': df
-                        })
-                        
-                        # Keep only last 10 data points
-                        if len(st.session_state.losers_data_history) > 10:
-                            st.session_state.losers_data_history = st.session_state.losers_data_history[-10:]
-                        
                         # Update title row metrics
                         if len(df) > 0:
                             symbols_placeholder.metric("Losers", len(df))
-                            current_time = datetime.now().strftime("%H:%M:%S")
+                            current_time = snapshot.timestamp.strftime("%H:%M:%S")
                             updated_placeholder.metric("Updated", current_time)
                         
                         # Display current data
@@ -1502,60 +3159,43 @@ def main():
                             )
                         
                         # Compact charts section
-                        if len(st.session_state.losers_data_history) > 1:
+                        if len(get_snapshot_history('losers')) > 1:
                             with chart_placeholder.container():
                                 # Create trend chart if we have numeric data
                                 if '% Change' in df.columns and pd.api.types.is_numeric_dtype(df['% Change']):
-                                    # Top 10 losers by percentage change (most negative)
-                                    top_losers = df.nsmallest(10, '% Change')
-                                    
-                                    fig = px.bar(
-                                        top_losers,
-                                        x='Symbol',
-                                        y='% Change',
-                                        title="Top 10 Daily Losers",
-                                        labels={'% Change': '% Change', 'Symbol': 'Symbol'},
-                                        color='% Change',
-                                        color_continuous_scale='Reds'
-                                    )
-                                    fig.update_layout(height=300, margin=dict(t=40, b=20))
-                                    st.plotly_chart(fig, use_container_width=True)
+                                    col1, col2 = st.columns(2)
+                                    with col1:
+                                        # Top 10 losers by percentage change (most negative)
+                                        fig = get_snapshot_chart('losers', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
+                                    with col2:
+                                        # Their % change over the session, from the history
+                                        fig = get_snapshot_chart('losers_trend', snapshot.version, df)
+                                        st.plotly_chart(fig, use_container_width=True)
                     
                     else:
                         st.warning("No losers data available in the response")
         
         elif st.session_state.selected_section == "OI Trend":
-            # Fetch OI Trend data (NSE OI Spurts with avgInOI > 2%)
-            with status_placeholder:
-                with st.spinner("Fetching OI Trend data..."):
-                    data, error = fetch_nse_data()
+            # Read the latest OI Trend snapshot (NSE OI Spurts with avgInOI > 2%)
+            snapshot, error = read_snapshot('oi_trend', status_placeholder, "OI Trend")
             
             if error:
                 st.error(f"Error fetching OI trend data: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.oi_trend_last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                st.session_state.oi_trend_last_update = snapshot.timestamp
                 
-                # Process and display data
-                if data:
-                    df = process_oi_trend_data(data)
+                # Display data
+                if snapshot.data is not None:
+                    df = snapshot.data
                     
                     if not df.empty:
-                        # Store in history
-                        st.session_state.oi_trend_data_history.append({
-                            'timestamp': datetime.now(),
-                            'data': df
-                        })
-                        
-                        # Keep only last 10 data points
-                        if len(st.session_state.oi_trend_data_history) > 10:
-                            st.session_state.oi_trend_data_history = st.session_state.oi_trend_data_history[-10:]
-                        
                         # Update title row metrics
                         if len(df) > 0:
                             symbols_placeholder.metric("OI Trend Stocks", len(df))
-                            current_time = datetime.now().strftime("%H:%M:%S")
+                            current_time = snapshot.timestamp.strftime("%H:%M:%S")
                             updated_placeholder.metric("Updated", current_time)
                         
                         # Display current data
@@ -1619,33 +3259,24 @@ def main():
                     st.warning("No OI trend data available in the response")
         
         elif st.session_state.selected_section == "Shortlisted Stocks":
-            # Fetch Shortlisted Stocks data
-            with status_placeholder:
-                with st.spinner("Processing Shortlisted Stocks data..."):
-                    df, error = process_shortlisted_stocks()
+            # Read the latest Shortlisted Stocks snapshot
+            snapshot, error = read_snapshot('shortlisted', status_placeholder, "Shortlisted Stocks")
             
             if error:
                 st.error(f"Error processing shortlisted stocks: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.shortlisted_last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                if snapshot.warning:
+                    st.warning(f"⚠️ {snapshot.warning}")
+                st.session_state.shortlisted_last_update = snapshot.timestamp
+                df = snapshot.data if snapshot.data is not None else pd.DataFrame()
                 
-                # Process and display data
+                # Display data
                 if not df.empty:
-                    # Store in history
-                    st.session_state.shortlisted_data_history.append({
-                        'timestamp': datetime.now(),
-                        'data': df
-                    })
-                    
-                    # Keep only last 10 data points
-                    if len(st.session_state.shortlisted_data_history) > 10:
-                        st.session_state.shortlisted_data_history = st.session_state.shortlisted_data_history[-10:]
-                    
                     # Update title row metrics
                     symbols_placeholder.metric("Shortlisted", len(df))
-                    current_time = datetime.now().strftime("%H:%M:%S")
+                    current_time = snapshot.timestamp.strftime("%H:%M:%S")
                     updated_placeholder.metric("Updated", current_time)
                     
                     # Display current data with enhanced metrics
@@ -1682,63 +3313,37 @@ def main():
                         
                         with col1:
                             # Scatter plot: % Change vs avgInOI
-                            fig_scatter = px.scatter(
-                                df,
-                                x='% Change',
-                                y='avgInOI',
-                                color='Movement Type',
-                                title="% Change vs Average OI",
-                                hover_data=['Symbol', 'Company Name'],
-                                color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
-                            )
-                            fig_scatter.update_layout(height=400)
+                            fig_scatter = get_snapshot_chart('shortlisted_scatter', snapshot.version, df)
                             st.plotly_chart(fig_scatter, use_container_width=True)
                         
                         with col2:
                             # Bar chart: Top stocks by avgInOI
-                            top_oi = df.nlargest(10, 'avgInOI')
-                            fig_bar = px.bar(
-                                top_oi,
-                                x='Symbol',
-                                y='avgInOI',
-                                color='Movement Type',
-                                title="Top 10 by Average OI",
-                                color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
-                            )
-                            fig_bar.update_layout(height=400)
+                            fig_bar = get_snapshot_chart('shortlisted_bar', snapshot.version, df)
                             st.plotly_chart(fig_bar, use_container_width=True)
                 
                 else:
                     st.info("No stocks meet the shortlisting criteria (>2% movement + avgInOI >7)")
         
         else:  # OI Based Shortlist section
-            # Fetch OI Based Shortlisted Stocks data
-            with status_placeholder:
-                with st.spinner("Processing OI Based Shortlisted Stocks data..."):
-                    df, error = process_oi_based_shortlisted_stocks()
+            if BUILDUP_RULE_ERROR:
+                st.error(f"⚙️ {BUILDUP_RULE_ERROR}")
+            
+            # Read the latest OI Based Shortlisted Stocks snapshot
+            snapshot, error = read_snapshot('oi_based_shortlist', status_placeholder, "OI Based Shortlisted Stocks")
             
             if error:
                 st.error(f"Error processing OI based shortlisted stocks: {error}")
                 status_placeholder.error("❌ Failed")
             else:
-                status_placeholder.success("✅ Success")
-                st.session_state.oi_based_shortlist_last_update = datetime.now()
+                show_snapshot_status(status_placeholder, snapshot)
+                st.session_state.oi_based_shortlist_last_update = snapshot.timestamp
+                df = snapshot.data if snapshot.data is not None else pd.DataFrame()
                 
-                # Process and display data
+                # Display data
                 if not df.empty:
-                    # Store in history
-                    st.session_state.oi_based_shortlist_data_history.append({
-                        'timestamp': datetime.now(),
-                        'data': df
-                    })
-                    
-                    # Keep only last 10 data points
-                    if len(st.session_state.oi_based_shortlist_data_history) > 10:
-                        st.session_state.oi_based_shortlist_data_history = st.session_state.oi_based_shortlist_data_history[-10:]
-                    
                     # Update title row metrics
                     symbols_placeholder.metric("OI Shortlisted", len(df))
-                    current_time = datetime.now().strftime("%H:%M:%S")
+                    current_time = snapshot.timestamp.strftime("%H:%M:%S")
                     updated_placeholder.metric("Updated", current_time)
                     
                     # Display current data with enhanced metrics
@@ -1770,15 +3375,14 @@ def main():
                             height=700
                         )
                 
-                else:
-                    st.info("No stocks found with matching buildup patterns between 9:15-9:30 and 9:30-9:45 intervals")
+                elif BUILDUP_RULE is not None:
+                    st.info(f"No stocks found with matching buildup patterns {BUILDUP_RULE.summary()}")
         
-        # Countdown for next refresh
-        if auto_refresh:
-            for i in range(60, 0, -1):
-                countdown_placeholder.info(f"⏱️ Next refresh in: {i}s")
-                time.sleep(1)
-            st.rerun()
+        st.session_state.rendered_snapshot_key = (
+            st.session_state.selected_section, snapshot_render_key(snapshot)
+        )
+        # New snapshots are picked up by the watch_section_snapshot() timer, no script thread is held
+        countdown_placeholder.info(f"⏱️ Checking every {AUTO_REFRESH_INTERVAL}s")
     
     else:
         # Manual mode
@@ -1786,8 +3390,9 @@ def main():
         
         # Show last data if available based on selected section
         if st.session_state.selected_section == "OI Spurts":
-            if st.session_state.data_history:
-                latest_data = st.session_state.data_history[-1]['data']
+            history = get_snapshot_history('oi_spurts')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
@@ -1806,8 +3411,9 @@ def main():
                 data_placeholder.info("No OI Spurts data available. Enable auto-refresh or click 'Refresh Now' to fetch data.")
         
         elif st.session_state.selected_section == "Daily Gainers":
-            if st.session_state.gainers_data_history:
-                latest_data = st.session_state.gainers_data_history[-1]['data']
+            history = get_snapshot_history('gainers')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
@@ -1830,8 +3436,9 @@ def main():
                 data_placeholder.info("No Daily Gainers data available. Enable auto-refresh or click 'Refresh Now' to fetch data.")
         
         elif st.session_state.selected_section == "Daily Losers":
-            if st.session_state.losers_data_history:
-                latest_data = st.session_state.losers_data_history[-1]['data']
+            history = get_snapshot_history('losers')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
@@ -1854,8 +3461,9 @@ def main():
                 data_placeholder.info("No Daily Losers data available. Enable auto-refresh or click 'Refresh Now' to fetch data.")
         
         elif st.session_state.selected_section == "OI Trend":
-            if st.session_state.oi_trend_data_history:
-                latest_data = st.session_state.oi_trend_data_history[-1]['data']
+            history = get_snapshot_history('oi_trend')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
@@ -1908,32 +3516,19 @@ def main():
                                         ):
                                             st.session_state.selected_stock_symbol = symbol
                                             # Fetch buildup data
-                                            secid = get_secid_for_symbol(symbol, st.session_state.futstk_mapping)
+                                            secid, secid_error = get_secid_for_symbol(symbol, get_futures_index())
                                             if secid:
                                                 with st.spinner(f"Fetching buildup data for {symbol}..."):
-                                                    # Debug info for RBLBANK
-                                                    if symbol == "RBLBANK":
-                                                        st.write(f"🔍 Debug (Static): Calling fetch_buildup_data with secid: {secid}")
-                                                    
-                                                    buildup_raw, error = fetch_buildup_data(secid)
-                                                    
-                                                    # Debug the API response for RBLBANK
-                                                    if symbol == "RBLBANK":
-                                                        st.write(f"📊 Debug (Static): API Response - Raw data length: {len(buildup_raw) if buildup_raw else 0}")
-                                                        st.write(f"❌ Debug (Static): Error message: {error if error else 'None'}")
-                                                        if buildup_raw:
-                                                            st.write(f"📋 Debug (Static): First few raw data items: {buildup_raw[:2] if len(buildup_raw) > 0 else 'Empty list'}")
+                                                    buildup_raw, error = get_buildup_data(secid)
                                                     
                                                     if error:
                                                         st.error(f"Error fetching buildup data: {error}")
                                                         st.session_state.buildup_data = None
                                                     else:
-                                                        formatted_data = format_buildup_data(buildup_raw)
-                                                        if symbol == "RBLBANK":
-                                                            st.write(f"📈 Debug (Static): Formatted data shape: {formatted_data.shape if not formatted_data.empty else 'Empty DataFrame'}")
+                                                        formatted_data = get_buildup_store().formatted(secid)
                                                         st.session_state.buildup_data = formatted_data
                                             else:
-                                                st.error(f"No secid found for {symbol} in July 2025 futures")
+                                                st.error(secid_error)
                                                 st.session_state.buildup_data = None
                                             st.rerun()
                     
@@ -1958,7 +3553,8 @@ def main():
                             st.dataframe(
                                 st.session_state.buildup_data,
                                 use_container_width=True,
-                                height=300
+                                height=300,
+                                column_config=BUILDUP_COLUMN_CONFIG
                             )
                         else:
                             st.info(f"No buildup data available for {st.session_state.selected_stock_symbol}")
@@ -1970,8 +3566,9 @@ def main():
                 data_placeholder.info("No OI Trend data available. Enable auto-refresh or click 'Refresh Now' to fetch data.")
         
         elif st.session_state.selected_section == "Shortlisted Stocks":
-            if st.session_state.shortlisted_data_history:
-                latest_data = st.session_state.shortlisted_data_history[-1]['data']
+            history = get_snapshot_history('shortlisted')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
@@ -2014,37 +3611,23 @@ def main():
                     
                     with col1:
                         # Scatter plot: % Change vs avgInOI
-                        fig_scatter = px.scatter(
-                            latest_data,
-                            x='% Change',
-                            y='avgInOI',
-                            color='Movement Type',
-                            title="% Change vs Average OI",
-                            hover_data=['Symbol', 'Company Name'],
-                            color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
-                        )
-                        fig_scatter.update_layout(height=400)
+                        fig_scatter = get_snapshot_chart('shortlisted_scatter', history.latest.version, latest_data)
                         st.plotly_chart(fig_scatter, use_container_width=True)
                     
                     with col2:
                         # Bar chart: Top stocks by avgInOI
-                        top_oi = latest_data.nlargest(10, 'avgInOI')
-                        fig_bar = px.bar(
-                            top_oi,
-                            x='Symbol',
-                            y='avgInOI',
-                            color='Movement Type',
-                            title="Top 10 by Average OI",
-                            color_discrete_map={'Gainer': 'green', 'Loser': 'red'}
-                        )
-                        fig_bar.update_layout(height=400)
+                        fig_bar = get_snapshot_chart('shortlisted_bar', history.latest.version, latest_data)
                         st.plotly_chart(fig_bar, use_container_width=True)
             else:
                 data_placeholder.info("No Shortlisted Stocks data available. Enable auto-refresh or click 'Refresh Now' to fetch data.")
         
         elif st.session_state.selected_section == "OI Based Shortlist":
-            if st.session_state.oi_based_shortlist_data_history:
-                latest_data = st.session_state.oi_based_shortlist_data_history[-1]['data']
+            if BUILDUP_RULE_ERROR:
+                st.error(f"⚙️ {BUILDUP_RULE_ERROR}")
+            
+            history = get_snapshot_history('oi_based_shortlist')
+            if history.latest is not None:
+                latest_data = history.latest.data
                 
                 # Update title row metrics
                 if len(latest_data) > 0:
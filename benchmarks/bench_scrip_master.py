@@ -0,0 +1,107 @@
+"""
+Benchmark scrip master parsing: csv module loop vs pyarrow / pandas columnar engines
+
+Usage:
+    python benchmarks/bench_scrip_master.py
+    python benchmarks/bench_scrip_master.py --rows 100000 --types FUTSTK OPTIDX --repeat 5
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fetch_and_extract  # noqa: E402
+from fetch_and_extract import create_instrument_mappings  # noqa: E402
+
+# Column layout of the Dhan scrip master
+HEADER = [
+    'SEM_EXM_EXCH_ID', 'SEM_SEGMENT', 'SEM_SMST_SECURITY_ID', 'SEM_INSTRUMENT_NAME',
+    'SEM_EXPIRY_CODE', 'SEM_TRADING_SYMBOL', 'SEM_LOT_UNITS', 'SEM_CUSTOM_SYMBOL',
+    'SEM_EXPIRY_DATE', 'SEM_STRIKE_PRICE', 'SEM_OPTION_TYPE', 'SEM_TICK_SIZE',
+    'SEM_EXPIRY_FLAG', 'SEM_EXCH_INSTRUMENT_TYPE', 'SEM_SERIES', 'SM_SYMBOL_NAME',
+]
+
+# Rough instrument mix of the real master, dominated by option contracts
+INSTRUMENTS = ['OPTSTK', 'OPTIDX', 'EQUITY', 'FUTSTK', 'FUTIDX', 'OPTCUR', 'FUTCOM']
+WEIGHTS = [0.55, 0.25, 0.1, 0.03, 0.01, 0.04, 0.02]
+
+
+def write_master(path, rows, seed=42):
+    """Write a synthetic scrip master with `rows` rows"""
+    rng = np.random.default_rng(seed)
+    instruments = rng.choice(INSTRUMENTS, size=rows, p=WEIGHTS)
+    underlyings = rng.integers(0, 20000, rows)
+    months = rng.choice(['Jul2025', 'Aug2025', 'Sep2025', 'Oct2025', 'Nov2025', 'Dec2025'], size=rows)
+    strikes = rng.integers(1, 400, rows) * 50
+
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            instrument = instruments[i]
+            name = f"SYM{underlyings[i]:04d}"
+            if instrument.startswith('FUT'):
+                symbol = f"{name}-{months[i]}-FUT"
+            elif instrument.startswith('OPT'):
+                symbol = f"{name}-{months[i]}-{strikes[i]}-{'CE' if i % 2 else 'PE'}"
+            else:
+                symbol = name
+            writer.writerow([
+                'NSE', 'D', str(100000 + i), instrument, '0', symbol, '1.0',
+                f"{name} {months[i]}", '2025-08-28 14:30:00', f"{strikes[i]:.5f}",
+                'XX', '5.0', 'M', instrument[:3], 'EQ', f"{name} LIMITED",
+            ])
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scrip master parsing engines')
+    parser.add_argument('--rows', type=int, default=500_000,
+                        help='Rows in the synthetic scrip master (default: %(default)s)')
+    parser.add_argument('--types', nargs='+', default=['FUTSTK'],
+                        help='Instrument types to extract (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Take the best of this many runs (default: %(default)s)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    engines = ['csv']
+    if fetch_and_extract.pd is not None:
+        engines.append('pandas')
+    if fetch_and_extract.pa is not None:
+        engines.append('pyarrow')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'api-scrip-master.csv')
+        write_master(path, args.rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"{args.rows:,} rows, {size_mb:.1f} MB, extracting {', '.join(args.types)}")
+
+        print(f"{'engine':>8} {'entries':>9} {'time (s)':>10} {'speedup':>9}")
+        baseline = expected = None
+        for engine in engines:
+            elapsed, mappings = best_of(lambda: create_instrument_mappings(path, args.types, engine), args.repeat)
+            if expected is None:
+                baseline, expected = elapsed, mappings
+            assert mappings == expected, f"{engine} mappings differ from csv"
+            entries = sum(len(mapping) for mapping in mappings.values())
+            print(f"{engine:>8} {entries:>9,} {elapsed:>10.3f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark the shortlisted stocks join: legacy iterrows scan vs vectorized merge
+
+Usage:
+    python benchmarks/bench_shortlist_join.py
+    python benchmarks/bench_shortlist_join.py --sizes 200 2000 --repeat 5
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+from app import build_shortlist  # noqa: E402
+
+
+def make_frames(rows, seed=42):
+    """Synthetic gainers, losers and OI frames with `rows` OI symbols"""
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"SYM{i:06d}" for i in range(rows)])
+    
+    oi_df = pd.DataFrame({
+        'symbol': symbols,
+        'avgInOI': rng.uniform(0, 15, rows).round(2),
+        'chngInOI': rng.integers(-50000, 50000, rows),
+        'pctChngInOI': rng.uniform(-20, 20, rows).round(2),
+    })
+    
+    def movers(sign):
+        picked = rng.choice(symbols, size=rows // 2, replace=False)
+        return pd.DataFrame({
+            'Symbol': picked,
+            'Company Name': [f"{symbol} Ltd" for symbol in picked],
+            'LTP': rng.uniform(50, 5000, len(picked)).round(2),
+            'Change': sign * rng.uniform(0, 100, len(picked)).round(2),
+            '% Change': sign * rng.uniform(0, 10, len(picked)).round(2),
+            'Volume': rng.integers(1000, 10_000_000, len(picked)),
+        })
+    
+    return movers(1), movers(-1), oi_df
+
+
+def legacy_build_shortlist(gainers_df, losers_df, oi_df):
+    """The original per-row implementation, kept here as the reference"""
+    shortlisted_stocks = []
+    for movers_df, movement_type in [(gainers_df, 'Gainer'), (losers_df, 'Loser')]:
+        if movement_type == 'Gainer':
+            filtered = movers_df[movers_df['% Change'] >= 2.0]
+        else:
+            filtered = movers_df[movers_df['% Change'] <= -2.0]
+        for _, mover in filtered.iterrows():
+            symbol = mover['Symbol']
+            oi_match = oi_df[oi_df['symbol'] == symbol]
+            if not oi_match.empty:
+                oi_row = oi_match.iloc[0]
+                if 'avgInOI' in oi_row and pd.notna(oi_row['avgInOI']) and oi_row['avgInOI'] > 7:
+                    shortlisted_stocks.append({
+                        'Symbol': symbol,
+                        'Company Name': mover['Company Name'],
+                        'LTP': mover['LTP'],
+                        'Change': mover['Change'],
+                        '% Change': mover['% Change'],
+                        'Volume': mover['Volume'],
+                        'Movement Type': movement_type,
+                        'avgInOI': oi_row['avgInOI'],
+                        'chngInOI': oi_row.get('chngInOI', 0),
+                        'pctChngInOI': oi_row.get('pctChngInOI', 0)
+                    })
+    return pd.DataFrame(shortlisted_stocks)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shortlisted stocks join')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 2000, 20000],
+                        help='Number of OI rows per run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Take the best of this many runs (default: %(default)s)')
+    args = parser.parse_args()
+    
+    print(f"{'rows':>8} {'shortlisted':>12} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in args.sizes:
+        gainers_df, losers_df, oi_df = make_frames(rows)
+        legacy_time, expected = best_of(lambda: legacy_build_shortlist(gainers_df, losers_df, oi_df),
+                                        1 if rows > 5000 else args.repeat)
+        vector_time, actual = best_of(lambda: build_shortlist(gainers_df, losers_df, oi_df), args.repeat)
+        
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        print(f"{rows:>8} {len(actual):>12} {legacy_time:>12.4f} {vector_time:>15.4f} {legacy_time / vector_time:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
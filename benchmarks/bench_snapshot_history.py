@@ -0,0 +1,88 @@
+"""
+Benchmark snapshot history: list of full DataFrames vs the columnar ring buffer
+
+Usage:
+    python benchmarks/bench_snapshot_history.py
+    python benchmarks/bench_snapshot_history.py --symbols 500 --snapshots 750
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+from app import HISTORY_CAPACITY, Snapshot, SnapshotHistory  # noqa: E402
+
+
+def make_snapshots(symbols, snapshots, seed=42):
+    """OI Spurts shaped frames, one per poll, with a few symbols dropping in and out"""
+    rng = np.random.default_rng(seed)
+    names = [f"SYM{i:04d}" for i in range(symbols)]
+    start = datetime(2025, 8, 1, 9, 15)
+    for version in range(1, snapshots + 1):
+        keep = rng.random(symbols) < 0.95
+        rows = int(keep.sum())
+        timestamp = start + timedelta(minutes=version)
+        df = pd.DataFrame({
+            'symbol': np.array(names, dtype=object)[keep],
+            'latestOI': rng.integers(10_000, 5_000_000, rows),
+            'prevOI': rng.integers(10_000, 5_000_000, rows),
+            'chngInOI': rng.normal(0, 50_000, rows),
+            'pctChngInOI': rng.normal(0, 5, rows),
+            'avgInOI': rng.normal(2, 3, rows),
+            'volume': rng.integers(0, 10_000_000, rows),
+            'futValue': rng.random(rows) * 1e6,
+            'underlyingValue': rng.random(rows) * 5000,
+            'timestamp': timestamp,
+        })
+        yield Snapshot('oi_spurts', version, timestamp, df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the snapshot history ring buffer')
+    parser.add_argument('--symbols', type=int, default=200,
+                        help='Symbols per snapshot (default: %(default)s)')
+    parser.add_argument('--snapshots', type=int, default=HISTORY_CAPACITY,
+                        help='Snapshots in a trading day (default: %(default)s)')
+    args = parser.parse_args()
+
+    snapshots = list(make_snapshots(args.symbols, args.snapshots))
+    frames_bytes = sum(snapshot.data.memory_usage(deep=True).sum() for snapshot in snapshots)
+
+    history = SnapshotHistory('symbol', capacity=args.snapshots)
+    start = time.perf_counter()
+    for snapshot in snapshots:
+        history.append(snapshot)
+    append_us = (time.perf_counter() - start) / len(snapshots) * 1e6
+
+    # Last N values of one symbol: scan the frame list vs slice the ring buffer
+    symbol, last = 'SYM0007', 50
+    start = time.perf_counter()
+    for _ in range(100):
+        expected = [
+            frame.loc[frame['symbol'] == symbol, 'pctChngInOI'].iloc[0] if (frame['symbol'] == symbol).any() else np.nan
+            for frame in (snapshot.data for snapshot in snapshots[-last:])
+        ]
+    frames_us = (time.perf_counter() - start) / 100 * 1e6
+    start = time.perf_counter()
+    for _ in range(100):
+        actual = history.series(symbol, 'pctChngInOI', last)
+    ring_us = (time.perf_counter() - start) / 100 * 1e6
+    np.testing.assert_array_equal(actual.to_numpy(), np.array(expected))
+
+    print(f"{args.snapshots} snapshots x {args.symbols} symbols")
+    print(f"{'store':>14} {'memory (MB)':>12} {'last 50 for 1 symbol (us)':>27}")
+    print(f"{'DataFrames':>14} {frames_bytes / 1024 / 1024:>12.1f} {frames_us:>27.0f}")
+    print(f"{'ring buffer':>14} {history.nbytes / 1024 / 1024:>12.1f} {ring_us:>27.1f}")
+    print(f"append: {append_us:.0f} us per snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark the symbol search index: linear substring scan vs prefix bisect + trigram lookup
+
+Usage:
+    python benchmarks/bench_symbol_search.py
+    python benchmarks/bench_symbol_search.py --sizes 100000 --queries 2000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+from app import SYMBOL_SEARCH_LIMIT, SymbolSearchIndex  # noqa: E402
+
+
+def make_symbols(count, seed=42):
+    """Synthetic trading symbols shaped like the scrip master's"""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    months = ['Jul2025', 'Aug2025', 'Sep2025']
+    underlyings = [''.join(rng.choice(letters, size=rng.integers(3, 11))) for _ in range(max(count // 60, 1))]
+    symbols = set()
+    while len(symbols) < count:
+        underlying = underlyings[rng.integers(len(underlyings))]
+        month = months[rng.integers(3)]
+        if rng.random() < 0.1:
+            symbols.add(f"{underlying}-{month}-FUT")
+        else:
+            symbols.add(f"{underlying}-{month}-{rng.integers(1, 400) * 50}-{'CE' if rng.random() < 0.5 else 'PE'}")
+    return sorted(symbols), underlyings
+
+
+def make_queries(underlyings, count, seed=7):
+    """Mix of prefixes and inner substrings of real underlyings, plus misses"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in range(count):
+        underlying = underlyings[rng.integers(len(underlyings))]
+        if i % 3 == 0:
+            queries.append(underlying[:rng.integers(1, len(underlying) + 1)])
+        elif i % 3 == 1:
+            start = rng.integers(0, max(len(underlying) - 3, 0) + 1)
+            queries.append(underlying[start:start + 3 + rng.integers(0, 3)])
+        else:
+            queries.append('QXZ' + underlying[:2])
+    return queries
+
+
+def linear_search(symbols, query, limit=SYMBOL_SEARCH_LIMIT):
+    """The scan the picker would need without an index"""
+    key = query.upper()
+    prefix = [symbol for symbol in symbols if symbol.upper().startswith(key)][:limit]
+    if len(prefix) >= limit or len(key) < 3:
+        return prefix
+    inner = [symbol for symbol in symbols if key in symbol.upper() and not symbol.upper().startswith(key)]
+    return (prefix + inner)[:limit]
+
+
+def time_queries(fn, queries):
+    timings = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1e6
+    return timings.mean(), np.percentile(timings, 99), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the symbol search index')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help='Number of symbols per run (default: %(default)s)')
+    parser.add_argument('--queries', type=int, default=1000,
+                        help='Queries per run (default: %(default)s)')
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8} {'build (s)':>10} {'index avg/p99 (us)':>20} {'linear avg (us)':>16} {'speedup':>9}")
+    for size in args.sizes:
+        symbols, underlyings = make_symbols(size)
+        queries = make_queries(underlyings, args.queries)
+
+        start = time.perf_counter()
+        index = SymbolSearchIndex(symbols)
+        build_time = time.perf_counter() - start
+        index.search(queries[0])
+
+        index_avg, index_p99, actual = time_queries(index.search, queries)
+        linear_queries = queries[:max(args.queries // 20, 10)]
+        linear_avg, _, expected = time_queries(lambda query: linear_search(index.symbols, query), linear_queries)
+        assert actual[:len(expected)] == expected, "index results differ from the linear scan"
+
+        print(f"{size:>8} {build_time:>10.2f} {index_avg:>9.1f} / {index_p99:>8.1f} {linear_avg:>16.0f} {linear_avg / index_avg:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,51 @@ import json
 import os
 import logging
 import argparse
-from datetime import datetime
-from typing import Dict, Optional
+import bisect
+import functools
+import hashlib
+import mmap
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Optional columnar engines for parsing the scrip master
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Bytes written per chunk when streaming the scrip master to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Engines for parsing the scrip master; 'auto' picks the fastest one installed
+CSV_ENGINES = ('auto', 'pyarrow', 'pandas', 'csv')
+
+# Scrip master columns needed to build the mappings
+MAPPING_COLUMNS = ['SEM_INSTRUMENT_NAME', 'SEM_TRADING_SYMBOL', 'SEM_SMST_SECURITY_ID']
+
+# Binary mapping index: header, (count + 1) symbol offsets, count secids, then the
+# UTF-8 symbols sorted bytewise and concatenated. All integers are little-endian u32.
+MAPPING_INDEX_MAGIC = b'SYMX'
+MAPPING_INDEX_VERSION = 1
+MAPPING_INDEX_HEADER = struct.Struct('<4sHHII')  # magic, version, reserved, count, symbols size
+
+# Indexed SQLite copy of the whole scrip master
+SCRIP_MASTER_DB = 'scrip_master.db'
+
+# NSE trading dates are IST dates, whatever the host's time zone
+IST_OFFSET = timedelta(hours=5, minutes=30)
 
 def setup_logging() -> None:
     """
@@ -21,34 +64,98 @@ def setup_logging() -> None:
     )
 
 def download_csv(url: str = "https://images.dhan.co/api-data/api-scrip-master.csv", 
-                filename: str = 'api-scrip-master.csv') -> bool:
+                filename: str = 'api-scrip-master.csv',
+                chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> bool:
     """
     Download the api-scrip-master.csv file from the given URL
     
+    The response is streamed in chunks to `<filename>.part` and renamed into place
+    once complete, so memory stays flat and readers never see a half-written file.
+    An interrupted download resumes from the end of the .part file with a Range
+    request; the body is requested without content encoding so the .part size is the
+    exact resume offset. The ETag/Last-Modified of the previous download are sent back as
+    If-None-Match/If-Modified-Since, so an unchanged master is not downloaded again.
+    
     Args:
         url: The URL to download from
         filename: The local filename to save as
+        chunk_size: Number of bytes written per chunk
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if the file is up to date (downloaded or unchanged), False otherwise
     """
     logging.info(f"Downloading {filename} from {url}...")
     
+    part_filename = f"{filename}.part"
+    metadata_filename = f"{filename}.meta.json"
+    metadata = load_download_metadata(metadata_filename)
+    
     try:
         # Add headers to mimic a browser request
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            # Ask for the body as stored: a Range offset counts encoded bytes, so a
+            # gzip-encoded response would leave the .part size out of step with it
+            'Accept-Encoding': 'identity'
         }
         
-        response = requests.get(url, timeout=30, headers=headers)
-        response.raise_for_status()
+        # Conditional request against the copy we already have
+        if os.path.exists(filename):
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+        
+        # Resume a partial download, but only if the remote file is still the same version
+        resume_from = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+        partial_validator = metadata.get('partial', {}).get('etag') or metadata.get('partial', {}).get('last_modified')
+        if resume_from and partial_validator:
+            headers['Range'] = f"bytes={resume_from}-"
+            headers['If-Range'] = partial_validator
+        else:
+            resume_from = 0
+        
+        with requests.get(url, timeout=30, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                logging.info(f"{filename} is unchanged on the server, skipping download")
+                return True
+            
+            if response.status_code == 416:
+                # The partial file doesn't match the remote file any more, start over
+                logging.warning(f"Cannot resume {part_filename}, restarting download")
+                os.remove(part_filename)
+                metadata.pop('partial', None)
+                save_download_metadata(metadata_filename, metadata)
+                return download_csv(url, filename, chunk_size)
+            
+            response.raise_for_status()
+            
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+            
+            if response.status_code == 206:
+                logging.info(f"Resuming download at byte {resume_from:,}")
+                mode = 'ab'
+            else:
+                resume_from = 0
+                mode = 'wb'
+                metadata['partial'] = validators
+                save_download_metadata(metadata_filename, metadata)
+            
+            # Stream the CSV file to disk
+            bytes_written = resume_from
+            with open(part_filename, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    bytes_written += len(chunk)
         
-        # Save the CSV file
-        with open(filename, 'wb') as f:
-            f.write(response.content)
+        os.replace(part_filename, filename)
+        metadata = {**validators, 'size': bytes_written, 'downloaded_at': datetime.now().isoformat()}
+        save_download_metadata(metadata_filename, metadata)
         
-        file_size = len(response.content)
-        logging.info(f"Successfully downloaded {filename} ({file_size:,} bytes)")
+        logging.info(f"Successfully downloaded {filename} ({bytes_written:,} bytes)")
         return True
         
     except requests.exceptions.Timeout:
@@ -67,6 +174,33 @@ def download_csv(url: str = "https://images.dhan.co/api-data/api-scrip-master.cs
         logging.error(f"Error saving file: {e}")
         return False
 
+def load_download_metadata(metadata_filename: str) -> Dict:
+    """
+    Load the validators saved by the previous download, if any
+    
+    Args:
+        metadata_filename: Path to the download metadata JSON
+    
+    Returns:
+        Dict: Saved metadata, empty if missing or unreadable
+    """
+    try:
+        with open(metadata_filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def save_download_metadata(metadata_filename: str, metadata: Dict) -> None:
+    """
+    Save download validators next to the downloaded file
+    
+    Args:
+        metadata_filename: Path to the download metadata JSON
+        metadata: Validators and download details to save
+    """
+    with open(metadata_filename, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
 def create_futstk_mapping(csv_filename: str = 'api-scrip-master.csv', 
                           instrument_type: str = 'FUTSTK') -> Dict[str, str]:
     """
@@ -80,23 +214,77 @@ def create_futstk_mapping(csv_filename: str = 'api-scrip-master.csv',
     Returns:
         Dict[str, str]: Mapping of trading symbols to security IDs
     """
-    logging.info(f"Extracting {instrument_type} mappings from {csv_filename}...")
-    mapping = {}
+    return create_instrument_mappings(csv_filename, [instrument_type]).get(instrument_type, {})
+
+def resolve_csv_engine(engine: str = 'auto') -> str:
+    """
+    Resolve the engine used to parse the scrip master
+    
+    Args:
+        engine: One of CSV_ENGINES
+    
+    Returns:
+        str: 'pyarrow', 'pandas' or 'csv'; an engine that is not installed falls
+        back to the next one available
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}', expected one of {', '.join(CSV_ENGINES)}")
+    
+    if engine in ('auto', 'pyarrow') and pa is not None:
+        return 'pyarrow'
+    if engine in ('auto', 'pyarrow', 'pandas') and pd is not None:
+        return 'pandas'
+    if engine != 'auto' and engine != 'csv':
+        logging.warning(f"CSV engine '{engine}' is not installed, falling back to csv")
+    return 'csv'
+
+def create_instrument_mappings(csv_filename: str = 'api-scrip-master.csv',
+                               instrument_types: Iterable[str] = ('FUTSTK',),
+                               engine: str = 'auto') -> Dict[str, Dict[str, str]]:
+    """
+    Create SEM_TRADING_SYMBOL to SEM_SMST_SECURITY_ID mappings for several
+    instrument types in a single pass over the CSV file
+    
+    Each row is routed to the accumulator of its SEM_INSTRUMENT_NAME, so extracting
+    FUTSTK, FUTIDX, OPTSTK and OPTIDX costs about the same as extracting one of them.
+    With a columnar engine only the three mapping columns are parsed and rows are
+    filtered with vectorized masks; the csv module path is used when neither
+    pyarrow nor pandas is installed, or when the columnar parse fails.
+    
+    Args:
+        csv_filename: Path to the CSV file
+        instrument_types: Types of instrument to extract (e.g. 'FUTSTK', 'OPTIDX')
+        engine: One of CSV_ENGINES (default: 'auto')
+    
+    Returns:
+        Dict[str, Dict[str, str]]: Mapping of trading symbols to security IDs per
+        instrument type, empty on error
+    """
+    instrument_types = list(dict.fromkeys(instrument_types))
+    engine = resolve_csv_engine(engine)
+    logging.info(f"Extracting {', '.join(instrument_types)} mappings from {csv_filename} ({engine} engine)...")
+    mappings = {instrument_type: {} for instrument_type in instrument_types}
+    duplicates = {instrument_type: 0 for instrument_type in instrument_types}
     
     if not os.path.exists(csv_filename):
         logging.error(f"CSV file {csv_filename} not found")
         return {}
     
+    if engine != 'csv':
+        try:
+            return create_instrument_mappings_columnar(csv_filename, instrument_types, engine)
+        except Exception as e:
+            logging.warning(f"{engine} engine failed ({e}), falling back to csv")
+    
     try:
         with open(csv_filename, 'r', encoding='utf-8') as file:
             reader = csv.reader(file)
             header = next(reader)
             
             # Find the indices of required columns
-            required_columns = ['SEM_INSTRUMENT_NAME', 'SEM_TRADING_SYMBOL', 'SEM_SMST_SECURITY_ID']
             column_indices = {}
             
-            for col in required_columns:
+            for col in MAPPING_COLUMNS:
                 try:
                     column_indices[col] = header.index(col)
                 except ValueError:
@@ -105,42 +293,47 @@ def create_futstk_mapping(csv_filename: str = 'api-scrip-master.csv',
             
             logging.info(f"Column indices - {', '.join([f'{col}: {idx}' for col, idx in column_indices.items()])}")
             
+            instrument_idx = column_indices['SEM_INSTRUMENT_NAME']
+            symbol_idx = column_indices['SEM_TRADING_SYMBOL']
+            security_id_idx = column_indices['SEM_SMST_SECURITY_ID']
+            min_required_idx = max(column_indices.values())
+            
             # Process each row
             row_count = 0
-            instrument_count = 0
-            duplicates = 0
             
             for row_num, row in enumerate(reader, start=2):  # Start from 2 since header is row 1
                 row_count += 1
                 
                 # Check if row has enough columns
-                min_required_idx = max(column_indices.values())
                 if len(row) <= min_required_idx:
                     continue
                 
-                # Check if this is the instrument type we want
-                if row[column_indices['SEM_INSTRUMENT_NAME']] == instrument_type:
-                    trading_symbol = row[column_indices['SEM_TRADING_SYMBOL']].strip()
-                    security_id = row[column_indices['SEM_SMST_SECURITY_ID']].strip()
-                    
-                    # Skip empty values
-                    if not trading_symbol or not security_id:
-                        continue
-                    
-                    # Check for duplicates
-                    if trading_symbol in mapping:
-                        if mapping[trading_symbol] != security_id:
-                            logging.warning(f"Duplicate trading symbol '{trading_symbol}' with different security IDs: {mapping[trading_symbol]} vs {security_id} (row {row_num})")
-                        duplicates += 1
-                    else:
-                        mapping[trading_symbol] = security_id
-                        instrument_count += 1
+                # Route the row to the accumulator of its instrument type
+                mapping = mappings.get(row[instrument_idx])
+                if mapping is None:
+                    continue
+                
+                trading_symbol = row[symbol_idx].strip()
+                security_id = row[security_id_idx].strip()
+                
+                # Skip empty values
+                if not trading_symbol or not security_id:
+                    continue
+                
+                # Check for duplicates
+                if trading_symbol in mapping:
+                    if mapping[trading_symbol] != security_id:
+                        logging.warning(f"Duplicate trading symbol '{trading_symbol}' with different security IDs: {mapping[trading_symbol]} vs {security_id} (row {row_num})")
+                    duplicates[row[instrument_idx]] += 1
+                else:
+                    mapping[trading_symbol] = security_id
             
-            logging.info(f"Processed {row_count:,} rows, found {instrument_count} unique {instrument_type} entries")
-            if duplicates > 0:
-                logging.warning(f"Found {duplicates} duplicate trading symbols")
+            for instrument_type, mapping in mappings.items():
+                logging.info(f"Processed {row_count:,} rows, found {len(mapping)} unique {instrument_type} entries")
+                if duplicates[instrument_type] > 0:
+                    logging.warning(f"Found {duplicates[instrument_type]} duplicate {instrument_type} trading symbols")
         
-        return mapping
+        return mappings
         
     except FileNotFoundError:
         logging.error(f"CSV file {csv_filename} not found")
@@ -155,16 +348,152 @@ def create_futstk_mapping(csv_filename: str = 'api-scrip-master.csv',
         logging.error(f"Unexpected error processing CSV file: {e}")
         return {}
 
+def read_mapping_columns(csv_filename: str, instrument_types: Iterable[str],
+                         engine: str) -> "tuple[pd.DataFrame, int]":
+    """
+    Read the mapping columns of the scrip master rows of the given types, with
+    symbols and security IDs stripped and rows missing either dropped
+    
+    Args:
+        csv_filename: Path to the CSV file
+        instrument_types: Instrument types to keep
+        engine: 'pyarrow' or 'pandas'
+    
+    Returns:
+        tuple: (DataFrame of instrument, symbol and security_id indexed by CSV
+        row number with the header as row 1, total number of rows read). Short
+        rows are skipped (pyarrow, which shifts later row numbers) or left blank
+        (pandas) like in the csv path; rows with extra fields raise so the
+        caller falls back to csv
+    """
+    instrument_types = list(instrument_types)
+    if engine == 'pyarrow':
+        table = pa_csv.read_csv(
+            csv_filename,
+            parse_options=pa_csv.ParseOptions(
+                invalid_row_handler=lambda row: 'skip' if row.actual_columns < row.expected_columns else 'error'
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=MAPPING_COLUMNS,
+                column_types={col: pa.string() for col in MAPPING_COLUMNS},
+                strings_can_be_null=False
+            )
+        )
+        # Filter and strip in Arrow so only the kept rows are converted to pandas
+        symbols = pc.utf8_trim_whitespace(table['SEM_TRADING_SYMBOL'])
+        security_ids = pc.utf8_trim_whitespace(table['SEM_SMST_SECURITY_ID'])
+        mask = pc.and_(
+            pc.is_in(table['SEM_INSTRUMENT_NAME'], value_set=pa.array(instrument_types, pa.string())),
+            pc.and_(pc.not_equal(symbols, ''), pc.not_equal(security_ids, ''))
+        )
+        row_indices = pc.indices_nonzero(mask)
+        frame = pa.table({
+            'instrument': table['SEM_INSTRUMENT_NAME'].take(row_indices),
+            'symbol': symbols.take(row_indices),
+            'security_id': security_ids.take(row_indices),
+        }).to_pandas()
+        return frame.set_axis(row_indices.to_numpy() + 2), table.num_rows
+    
+    frame = pd.read_csv(
+        csv_filename,
+        usecols=MAPPING_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        encoding='utf-8'
+    )
+    row_count = len(frame)
+    frame = frame.set_axis(pd.RangeIndex(2, row_count + 2))
+    frame = frame[frame['SEM_INSTRUMENT_NAME'].isin(instrument_types)]
+    symbols = frame['SEM_TRADING_SYMBOL'].fillna('').str.strip()
+    security_ids = frame['SEM_SMST_SECURITY_ID'].fillna('').str.strip()
+    keep = (symbols != '') & (security_ids != '')
+    frame = pd.DataFrame({
+        'instrument': frame['SEM_INSTRUMENT_NAME'][keep],
+        'symbol': symbols[keep],
+        'security_id': security_ids[keep],
+    })
+    return frame, row_count
+
+def create_instrument_mappings_columnar(csv_filename: str,
+                                        instrument_types: Iterable[str],
+                                        engine: str) -> Dict[str, Dict[str, str]]:
+    """
+    Columnar version of the create_instrument_mappings loop
+    
+    Args:
+        csv_filename: Path to the CSV file
+        instrument_types: Types of instrument to extract
+        engine: 'pyarrow' or 'pandas'
+    
+    Returns:
+        Dict[str, Dict[str, str]]: Same result as the csv path, empty when a
+        required column is missing
+    """
+    with open(csv_filename, 'r', encoding='utf-8', newline='') as file:
+        header = next(csv.reader(file), [])
+    for col in MAPPING_COLUMNS:
+        if col not in header:
+            logging.error(f"Required column '{col}' not found in CSV header")
+            return {}
+    
+    frame, row_count = read_mapping_columns(csv_filename, instrument_types, engine)
+    
+    # First occurrence wins; later ones are counted and conflicting IDs logged
+    repeated = frame.duplicated(['instrument', 'symbol']).to_numpy()
+    mappings = {instrument_type: {} for instrument_type in instrument_types}
+    for instrument_type, rows in frame[~repeated].groupby('instrument', sort=False):
+        mappings[instrument_type] = dict(zip(rows['symbol'], rows['security_id']))
+    
+    duplicate_rows = frame[repeated]
+    for row_num, instrument_type, trading_symbol, security_id in zip(
+            duplicate_rows.index, duplicate_rows['instrument'],
+            duplicate_rows['symbol'], duplicate_rows['security_id']):
+        first_id = mappings[instrument_type][trading_symbol]
+        if first_id != security_id:
+            logging.warning(f"Duplicate trading symbol '{trading_symbol}' with different security IDs: {first_id} vs {security_id} (row {row_num})")
+    duplicates = duplicate_rows['instrument'].value_counts()
+    
+    for instrument_type, mapping in mappings.items():
+        logging.info(f"Processed {row_count:,} rows, found {len(mapping)} unique {instrument_type} entries")
+        if duplicates.get(instrument_type, 0) > 0:
+            logging.warning(f"Found {duplicates[instrument_type]} duplicate {instrument_type} trading symbols")
+    
+    return mappings
+
+def mapping_output_filename(output_file: str, instrument_type: str, multiple: bool) -> str:
+    """
+    Output JSON filename for an instrument type
+    
+    Args:
+        output_file: Output filename given on the command line
+        instrument_type: Instrument type being saved
+        multiple: Whether several instrument types are extracted in this run
+    
+    Returns:
+        str: `output_file` for a single type, otherwise `<type>_mapping.json`
+        next to it (e.g. optidx_mapping.json)
+    """
+    if not multiple:
+        return output_file
+    return os.path.join(os.path.dirname(output_file), f"{instrument_type.lower()}_mapping.json")
+
 def save_mapping_to_json(mapping: Dict[str, str], 
                         output_filename: str = 'futstk_mapping.json',
-                        add_metadata: bool = True) -> bool:
+                        add_metadata: bool = True,
+                        instrument_type: str = 'FUTSTK',
+                        content_hash: Optional[str] = None) -> bool:
     """
     Save the mapping to a JSON file with optional metadata
     
+    The file is written to a temporary name and renamed into place, so readers
+    never see a partially written mapping.
+    
     Args:
         mapping: Dictionary of trading symbols to security IDs
         output_filename: Output JSON filename
         add_metadata: Whether to include metadata in the JSON
+        instrument_type: Instrument type recorded in the metadata
+        content_hash: Content hash recorded in the metadata (computed if omitted)
     
     Returns:
         bool: True if successful, False otherwise
@@ -184,14 +513,17 @@ def save_mapping_to_json(mapping: Dict[str, str],
                     "generated_at": datetime.now().isoformat(),
                     "total_mappings": len(mapping),
                     "source": "https://images.dhan.co/api-data/api-scrip-master.csv",
-                    "instrument_type": "FUTSTK"
+                    "instrument_type": instrument_type,
+                    "content_hash": content_hash or mapping_content_hash(mapping)
                 }
             }
             data_to_save = {**metadata, **mapping}
         
         # Save to JSON file
-        with open(output_filename, 'w', encoding='utf-8') as f:
+        temp_filename = f"{output_filename}.tmp"
+        with open(temp_filename, 'w', encoding='utf-8') as f:
             json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+        os.replace(temp_filename, output_filename)
         
         file_size = os.path.getsize(output_filename)
         logging.info(f"Found {len(mapping):,} mappings")
@@ -220,6 +552,604 @@ def save_mapping_to_json(mapping: Dict[str, str],
         logging.error(f"Unexpected error saving mapping to JSON: {e}")
         return False
 
+def mapping_content_hash(mapping: Dict[str, str]) -> str:
+    """
+    Hash of a mapping's entries, independent of their order and of metadata
+    
+    Args:
+        mapping: Dictionary of trading symbols to security IDs
+    
+    Returns:
+        str: SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    for symbol in sorted(mapping):
+        if symbol != '_metadata':
+            digest.update(f"{symbol}\t{mapping[symbol]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_previous_mapping(output_filename: str) -> Dict[str, str]:
+    """
+    Load the mapping written by a previous run, without its metadata
+    
+    Args:
+        output_filename: JSON mapping filename
+    
+    Returns:
+        Dict[str, str]: Previous mapping, empty if there is none or it is unreadable
+    """
+    if not os.path.exists(output_filename):
+        return {}
+    try:
+        with open(output_filename, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        previous.pop('_metadata', None)
+        return previous
+    except (IOError, OSError, ValueError) as e:
+        logging.warning(f"Could not read previous mapping {output_filename}: {e}")
+        return {}
+
+def diff_mappings(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, Dict]:
+    """
+    Structured diff between two mappings
+    
+    Args:
+        previous: Mapping from the previous run
+        current: Newly extracted mapping
+    
+    Returns:
+        Dict[str, Dict]: 'added' and 'removed' map symbols to security IDs,
+        'changed' maps symbols to {'old': ..., 'new': ...}
+    """
+    return {
+        'added': {symbol: current[symbol] for symbol in current.keys() - previous.keys()},
+        'removed': {symbol: previous[symbol] for symbol in previous.keys() - current.keys()},
+        'changed': {
+            symbol: {'old': previous[symbol], 'new': current[symbol]}
+            for symbol in current.keys() & previous.keys()
+            if previous[symbol] != current[symbol]
+        },
+    }
+
+def mapping_changelog_filename(output_filename: str) -> str:
+    """
+    Changelog filename written next to a JSON mapping
+    
+    Args:
+        output_filename: JSON mapping filename
+    
+    Returns:
+        str: Same path with a .changelog.jsonl extension
+    """
+    return os.path.splitext(output_filename)[0] + '.changelog.jsonl'
+
+def append_mapping_changelog(changelog_filename: str, entry: Dict) -> bool:
+    """
+    Append one change entry to a mapping changelog (one JSON object per line)
+    
+    Args:
+        changelog_filename: Changelog filename
+        entry: Change entry, see main()
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with open(changelog_filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, sort_keys=True) + '\n')
+        return True
+    except (IOError, OSError) as e:
+        logging.error(f"Error writing to changelog {changelog_filename}: {e}")
+        return False
+
+def read_mapping_changelog(changelog_filename: str, since_hash: Optional[str] = None) -> List[Dict]:
+    """
+    Read the change entries of a mapping changelog
+    
+    A consumer holding the mapping with content hash `since_hash` can apply the
+    returned entries in order instead of re-reading the whole mapping.
+    
+    Args:
+        changelog_filename: Changelog filename
+        since_hash: Only return entries after the one that produced this hash
+    
+    Returns:
+        List[Dict]: Change entries, oldest first; all of them if `since_hash`
+        is None or not found in the changelog
+    """
+    entries = []
+    try:
+        with open(changelog_filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    except (IOError, OSError, ValueError) as e:
+        logging.warning(f"Could not read changelog {changelog_filename}: {e}")
+        return []
+    
+    if since_hash is not None:
+        for position, entry in enumerate(entries):
+            if entry.get('content_hash') == since_hash:
+                return entries[position + 1:]
+    return entries
+
+def mapping_index_filename(output_filename: str) -> str:
+    """
+    Binary index filename written next to a JSON mapping
+    
+    Args:
+        output_filename: JSON mapping filename
+    
+    Returns:
+        str: Same path with an .idx extension (e.g. futstk_mapping.idx)
+    """
+    return os.path.splitext(output_filename)[0] + '.idx'
+
+def encode_mapping_index(mapping: Dict[str, str]) -> bytes:
+    """
+    Encode a mapping as a binary index (see MAPPING_INDEX_HEADER)
+    
+    Entries whose security ID is not an unsigned 32-bit integer, such as the
+    _metadata entry of a JSON mapping, are left out.
+    
+    Args:
+        mapping: Dictionary of trading symbols to security IDs
+    
+    Returns:
+        bytes: The encoded index
+    """
+    entries = sorted(
+        (symbol.encode('utf-8'), int(security_id))
+        for symbol, security_id in mapping.items()
+        if str(security_id).isdigit() and int(security_id) < 2 ** 32
+    )
+    
+    offsets = array('I', [0])
+    secids = array('I')
+    for symbol, security_id in entries:
+        offsets.append(offsets[-1] + len(symbol))
+        secids.append(security_id)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        secids.byteswap()
+    
+    symbols = b''.join(symbol for symbol, _ in entries)
+    header = MAPPING_INDEX_HEADER.pack(MAPPING_INDEX_MAGIC, MAPPING_INDEX_VERSION, 0, len(entries), len(symbols))
+    return header + offsets.tobytes() + secids.tobytes() + symbols
+
+def save_mapping_index(mapping: Dict[str, str], index_filename: str = 'futstk_mapping.idx') -> bool:
+    """
+    Save the mapping as a binary index the dashboard can memory-map
+    
+    The file is written to a temporary name and renamed into place, so a running
+    dashboard keeps reading its mapped copy until it reopens the index.
+    
+    Args:
+        mapping: Dictionary of trading symbols to security IDs
+        index_filename: Output index filename
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    temp_filename = f"{index_filename}.tmp"
+    try:
+        data = encode_mapping_index(mapping)
+        with open(temp_filename, 'wb') as f:
+            f.write(data)
+        os.replace(temp_filename, index_filename)
+        logging.info(f"Mapping index saved to {index_filename} ({len(data):,} bytes)")
+        return True
+    except (IOError, OSError) as e:
+        logging.error(f"Error writing mapping index {index_filename}: {e}")
+        return False
+    except Exception as e:
+        logging.error(f"Unexpected error saving mapping index: {e}")
+        return False
+
+class MappingIndex:
+    """
+    Read-only view of a binary mapping index
+    
+    Lookups binary-search the sorted symbol table in place, so opening an index
+    costs the same whatever its size; only the pages touched by a lookup are read.
+    """
+    
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer: Encoded index (bytes or mmap)
+        
+        Raises:
+            ValueError: If the buffer is not a valid mapping index
+        """
+        if len(buffer) < MAPPING_INDEX_HEADER.size:
+            raise ValueError("Mapping index is truncated")
+        magic, version, _, count, symbols_size = MAPPING_INDEX_HEADER.unpack_from(buffer, 0)
+        if magic != MAPPING_INDEX_MAGIC or version != MAPPING_INDEX_VERSION:
+            raise ValueError("Not a mapping index, or an unsupported version")
+        if sys.byteorder != 'little':
+            raise ValueError("Memory-mapped mapping indexes need a little-endian host")
+        
+        offsets_start = MAPPING_INDEX_HEADER.size
+        secids_start = offsets_start + 4 * (count + 1)
+        symbols_start = secids_start + 4 * count
+        if len(buffer) != symbols_start + symbols_size:
+            raise ValueError("Mapping index size does not match its header")
+        
+        self._buffer = buffer
+        view = memoryview(buffer)
+        self._offsets = view[offsets_start:secids_start].cast('I')
+        self._secids = view[secids_start:symbols_start].cast('I')
+        self._symbols = view[symbols_start:]
+        self._count = count
+    
+    @classmethod
+    def open(cls, index_filename: str) -> 'MappingIndex':
+        """
+        Memory-map an index file
+        
+        Args:
+            index_filename: Path to the index file
+        
+        Returns:
+            MappingIndex: Index backed by the mapped file
+        """
+        with open(index_filename, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    
+    @classmethod
+    def from_mapping(cls, mapping: Dict[str, str]) -> 'MappingIndex':
+        """
+        Build an in-memory index from a mapping dictionary
+        
+        Args:
+            mapping: Dictionary of trading symbols to security IDs
+        
+        Returns:
+            MappingIndex: Index backed by an in-memory buffer
+        """
+        return cls(encode_mapping_index(mapping))
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __contains__(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+    
+    def _symbol_bytes(self, position: int) -> bytes:
+        return self._symbols[self._offsets[position]:self._offsets[position + 1]].tobytes()
+    
+    def _bisect(self, key: bytes) -> int:
+        return bisect.bisect_left(range(self._count), key, key=self._symbol_bytes)
+    
+    def symbol(self, position: int) -> str:
+        """
+        Trading symbol at a position of the sorted symbol table
+        """
+        return self._symbol_bytes(position).decode('utf-8')
+    
+    def get(self, symbol: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Look up the security ID of a trading symbol
+        
+        Args:
+            symbol: Trading symbol
+            default: Value returned when the symbol is not in the index
+        
+        Returns:
+            Optional[str]: Security ID as a string, like in the JSON mapping
+        """
+        key = symbol.encode('utf-8')
+        position = self._bisect(key)
+        if position < self._count and self._symbol_bytes(position) == key:
+            return str(self._secids[position])
+        return default
+    
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+        Positions [start, end) of the symbols starting with a prefix
+        """
+        key = prefix.encode('utf-8')
+        start = self._bisect(key)
+        end = start
+        while end < self._count and self._symbol_bytes(end).startswith(key):
+            end += 1
+        return start, end
+    
+    def items(self, prefix: str = '') -> Iterator[Tuple[str, str]]:
+        """
+        (trading symbol, security ID) pairs in symbol order, optionally only
+        those starting with a prefix
+        """
+        start, end = self.prefix_range(prefix) if prefix else (0, self._count)
+        for position in range(start, end):
+            yield self.symbol(position), str(self._secids[position])
+
+def current_ist_date() -> date:
+    """
+    Today's date in India, so expiry lookups don't depend on the host's time zone
+    
+    Returns:
+        date: Current IST date
+    """
+    return (datetime.utcnow() + IST_OFFSET).date()
+
+@functools.lru_cache(maxsize=4096)
+def parse_expiry_date(value: str) -> Optional[str]:
+    """
+    Normalize a SEM_EXPIRY_DATE value to an ISO date
+    
+    Args:
+        value: Expiry such as '2025-08-28 14:30:00'; blank or '-0001-...' for
+            instruments without an expiry
+    
+    Returns:
+        Optional[str]: 'YYYY-MM-DD', or None if the instrument does not expire
+    """
+    value = value.strip()
+    if len(value) < 10 or value.startswith('-'):
+        return None
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        return None
+
+def parse_underlying(trading_symbol: str, instrument_type: str) -> str:
+    """
+    Underlying of a trading symbol
+    
+    Futures are '<underlying>-<Mon><YYYY>-FUT' and options
+    '<underlying>-<Mon><YYYY>-<strike>-<CE|PE>'; underlyings may contain '-'
+    themselves (BAJAJ-AUTO), so the fixed suffix is split off from the right.
+    
+    Args:
+        trading_symbol: SEM_TRADING_SYMBOL value
+        instrument_type: SEM_INSTRUMENT_NAME value
+    
+    Returns:
+        str: Underlying symbol, or the trading symbol itself for cash instruments
+    """
+    if instrument_type.startswith('FUT'):
+        parts = trading_symbol.rsplit('-', 2)
+        return parts[0] if len(parts) == 3 else trading_symbol
+    if instrument_type.startswith('OPT'):
+        parts = trading_symbol.rsplit('-', 3)
+        return parts[0] if len(parts) == 4 else trading_symbol
+    return trading_symbol
+
+def build_scrip_master_db(csv_filename: str = 'api-scrip-master.csv',
+                          db_filename: str = SCRIP_MASTER_DB,
+                          batch_size: int = 50_000) -> bool:
+    """
+    Load the whole scrip master into an indexed SQLite database
+    
+    Every CSV column is kept as text, alongside normalized columns (instrument_type,
+    underlying, expiry, strike, option_type, security_id, trading_symbol) that are
+    indexed for chain and symbol lookups. Only the local CSV is read, so the
+    database can be rebuilt offline. It is built under a temporary name and
+    renamed into place, so open readers keep their old copy.
+    
+    Args:
+        csv_filename: Path to the CSV file
+        db_filename: Output database filename
+        batch_size: Rows inserted per executemany call
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not os.path.exists(csv_filename):
+        logging.error(f"CSV file {csv_filename} not found")
+        return False
+    
+    temp_filename = f"{db_filename}.tmp"
+    if os.path.exists(temp_filename):
+        os.remove(temp_filename)
+    
+    try:
+        with open(csv_filename, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            for col in MAPPING_COLUMNS:
+                if col not in header:
+                    logging.error(f"Required column '{col}' not found in CSV header")
+                    return False
+            
+            instrument_idx = header.index('SEM_INSTRUMENT_NAME')
+            symbol_idx = header.index('SEM_TRADING_SYMBOL')
+            security_id_idx = header.index('SEM_SMST_SECURITY_ID')
+            # Optional columns read from a padded row; missing ones point at the padding
+            width = len(header)
+            expiry_idx, strike_idx, option_type_idx = (
+                header.index(col) if col in header else width
+                for col in ('SEM_EXPIRY_DATE', 'SEM_STRIKE_PRICE', 'SEM_OPTION_TYPE')
+            )
+            min_required_idx = max(instrument_idx, symbol_idx, security_id_idx)
+            
+            raw_columns = ', '.join(f'"{col}" TEXT' for col in header)
+            placeholders = ', '.join('?' * (7 + width))
+            
+            connection = sqlite3.connect(temp_filename)
+            try:
+                connection.execute('PRAGMA journal_mode = OFF')
+                connection.execute('PRAGMA synchronous = OFF')
+                connection.execute(f"""
+                    CREATE TABLE instruments (
+                        instrument_type TEXT NOT NULL,
+                        underlying TEXT NOT NULL,
+                        expiry TEXT,
+                        strike REAL,
+                        option_type TEXT,
+                        security_id INTEGER,
+                        trading_symbol TEXT NOT NULL,
+                        {raw_columns}
+                    )
+                """)
+                
+                row_count = 0
+                batch = []
+                for row in reader:
+                    if len(row) <= min_required_idx:
+                        continue
+                    if len(row) != width:
+                        row = (row + [''] * width)[:width]
+                    padded = row + ['']
+                    
+                    instrument_type = row[instrument_idx].strip()
+                    trading_symbol = row[symbol_idx].strip()
+                    security_id = row[security_id_idx].strip()
+                    option_type = padded[option_type_idx].strip()
+                    strike = None
+                    if instrument_type.startswith('OPT'):
+                        try:
+                            strike = float(padded[strike_idx])
+                        except ValueError:
+                            pass
+                        if option_type not in ('CE', 'PE'):
+                            option_type = trading_symbol[-2:]
+                    
+                    batch.append((
+                        instrument_type,
+                        parse_underlying(trading_symbol, instrument_type),
+                        parse_expiry_date(padded[expiry_idx]),
+                        strike,
+                        option_type if option_type in ('CE', 'PE') else None,
+                        int(security_id) if security_id.isdigit() else None,
+                        trading_symbol,
+                        *row
+                    ))
+                    if len(batch) >= batch_size:
+                        connection.executemany(f"INSERT INTO instruments VALUES ({placeholders})", batch)
+                        row_count += len(batch)
+                        batch = []
+                if batch:
+                    connection.executemany(f"INSERT INTO instruments VALUES ({placeholders})", batch)
+                    row_count += len(batch)
+                
+                # Indexes are created after the load, which is much faster than
+                # maintaining them row by row
+                connection.execute("""
+                    CREATE INDEX idx_instruments_chain
+                    ON instruments (instrument_type, underlying, expiry, strike, option_type, security_id)
+                """)
+                connection.execute("CREATE INDEX idx_instruments_symbol ON instruments (trading_symbol)")
+                connection.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+                connection.executemany("INSERT INTO metadata VALUES (?, ?)", [
+                    ('generated_at', datetime.now().isoformat()),
+                    ('source_csv', os.path.abspath(csv_filename)),
+                    ('total_rows', str(row_count)),
+                ])
+                connection.commit()
+                connection.execute('ANALYZE')
+            finally:
+                connection.close()
+        
+        os.replace(temp_filename, db_filename)
+        logging.info(f"Scrip master database saved to {db_filename} ({row_count:,} rows, "
+                     f"{os.path.getsize(db_filename):,} bytes)")
+        return True
+        
+    except (csv.Error, UnicodeDecodeError) as e:
+        logging.error(f"Error parsing CSV file: {e}")
+    except sqlite3.Error as e:
+        logging.error(f"Error building scrip master database: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error building scrip master database: {e}")
+    
+    if os.path.exists(temp_filename):
+        os.remove(temp_filename)
+    return False
+
+class ScripMasterStore:
+    """
+    Read-only queries over the database written by build_scrip_master_db
+    
+    Chain lookups are answered from the covering index on (instrument_type,
+    underlying, expiry, strike, option_type, security_id) without touching the
+    table, in well under a millisecond.
+    """
+    
+    def __init__(self, db_filename: str = SCRIP_MASTER_DB):
+        """
+        Args:
+            db_filename: Database written by build_scrip_master_db
+        
+        Raises:
+            sqlite3.Error: If the database cannot be opened
+        """
+        self.db_filename = db_filename
+        self._connection = sqlite3.connect(f"file:{db_filename}?mode=ro", uri=True, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+    
+    def close(self) -> None:
+        self._connection.close()
+    
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+    
+    def expiries(self, underlying: str, instrument_type: str = 'OPTSTK',
+                 from_date: Optional[str] = None) -> List[str]:
+        """
+        Expiry dates of an underlying's contracts
+        
+        Args:
+            underlying: Underlying symbol, e.g. 'RELIANCE'
+            instrument_type: e.g. 'OPTSTK', 'OPTIDX', 'FUTSTK'
+            from_date: Only expiries on or after this ISO date (default: today in IST)
+        
+        Returns:
+            List[str]: ISO expiry dates, nearest first
+        """
+        rows = self._query(
+            "SELECT DISTINCT expiry FROM instruments "
+            "WHERE instrument_type = ? AND underlying = ? AND expiry >= ? ORDER BY expiry",
+            (instrument_type, underlying, from_date or current_ist_date().isoformat())
+        )
+        return [row['expiry'] for row in rows]
+    
+    def option_chain(self, underlying: str, instrument_type: str = 'OPTSTK',
+                     expiry: Optional[str] = None,
+                     option_type: Optional[str] = None) -> List[Dict]:
+        """
+        Strikes of an underlying's option contracts for one expiry
+        
+        Args:
+            underlying: Underlying symbol, e.g. 'RELIANCE'
+            instrument_type: 'OPTSTK' or 'OPTIDX'
+            expiry: ISO expiry date; the nearest live expiry if omitted
+            option_type: 'CE' or 'PE'; both if omitted
+        
+        Returns:
+            List[Dict]: strike, option_type and security_id per contract, by strike
+        """
+        if expiry is None:
+            expiries = self.expiries(underlying, instrument_type)
+            if not expiries:
+                return []
+            expiry = expiries[0]
+        
+        sql = ("SELECT strike, option_type, security_id FROM instruments "
+               "WHERE instrument_type = ? AND underlying = ? AND expiry = ?")
+        params = (instrument_type, underlying, expiry)
+        if option_type:
+            sql += " AND option_type = ?"
+            params += (option_type,)
+        return [dict(row) for row in self._query(sql + " ORDER BY strike, option_type", params)]
+    
+    def lookup(self, trading_symbol: str) -> Optional[Dict]:
+        """
+        Full scrip master row of a trading symbol
+        
+        Args:
+            trading_symbol: SEM_TRADING_SYMBOL value
+        
+        Returns:
+            Optional[Dict]: Normalized and original columns, or None if not found
+        """
+        rows = self._query("SELECT * FROM instruments WHERE trading_symbol = ? LIMIT 1", (trading_symbol,))
+        return dict(rows[0]) if rows else None
+
 def validate_mapping(mapping: Dict[str, str]) -> bool:
     """
     Validate the extracted mapping for basic sanity checks
@@ -254,19 +1184,30 @@ def validate_mapping(mapping: Dict[str, str]) -> bool:
 
 def main(skip_download: bool = False, 
          csv_url: str = "https://images.dhan.co/api-data/api-scrip-master.csv",
-         output_file: str = 'futstk_mapping.json') -> None:
+         output_file: str = 'futstk_mapping.json',
+         instrument_types: Iterable[str] = ('FUTSTK',),
+         add_metadata: bool = True,
+         engine: str = 'auto',
+         force: bool = False,
+         db_file: Optional[str] = None) -> None:
     """
-    Main function to download CSV and extract FUTSTK mappings
+    Main function to download CSV and extract instrument mappings
     
     Args:
         skip_download: Skip downloading if CSV already exists
         csv_url: URL to download CSV from
-        output_file: Output JSON filename
+        output_file: Output JSON filename (per-type names are used when
+            several instrument types are requested)
+        instrument_types: Instrument types to extract in one pass over the CSV
+        add_metadata: Whether to include metadata in the JSON
+        engine: CSV engine used to parse the scrip master, one of CSV_ENGINES
+        force: Rewrite the outputs even if the mapping content is unchanged
+        db_file: Also load the whole scrip master into this SQLite database
     """
     setup_logging()
     
     start_time = datetime.now()
-    logging.info("=== NSE Data Fetching and FUTSTK Mapping Extraction Started ===")
+    logging.info("=== NSE Data Fetching and Instrument Mapping Extraction Started ===")
     
     try:
         # Step 1: Download the CSV file (unless skipping)
@@ -279,21 +1220,72 @@ def main(skip_download: bool = False,
                 logging.error("Failed to download CSV file. Exiting.")
                 return
         
-        # Step 2: Extract FUTSTK mappings
-        mapping = create_futstk_mapping(csv_filename)
-        if not mapping:
-            logging.error("Failed to extract FUTSTK mappings. Exiting.")
+        # Step 2: Extract all requested mappings in a single pass
+        instrument_types = list(dict.fromkeys(instrument_types))
+        mappings = create_instrument_mappings(csv_filename, instrument_types, engine)
+        if not mappings:
+            logging.error("Failed to extract instrument mappings. Exiting.")
             return
         
-        # Step 3: Validate mappings
-        if not validate_mapping(mapping):
-            logging.error("Mapping validation failed. Exiting.")
-            return
+        output_files = []
+        for instrument_type in instrument_types:
+            mapping = mappings.get(instrument_type)
+            if not mapping:
+                logging.error(f"Failed to extract {instrument_type} mappings. Exiting.")
+                return
+            
+            # Step 3: Validate mappings
+            if not validate_mapping(mapping):
+                logging.error(f"{instrument_type} mapping validation failed. Exiting.")
+                return
+            
+            # Step 4: Compare with the previous output; an unchanged mapping is not
+            # rewritten, so its mtime only moves when consumers need to reload
+            type_output_file = mapping_output_filename(output_file, instrument_type, len(instrument_types) > 1)
+            index_file = mapping_index_filename(type_output_file)
+            previous_mapping = load_previous_mapping(type_output_file)
+            previous_hash = mapping_content_hash(previous_mapping) if previous_mapping else None
+            content_hash = mapping_content_hash(mapping)
+            
+            if content_hash == previous_hash and not force:
+                logging.info(f"{instrument_type} mappings unchanged ({content_hash[:12]}), keeping {type_output_file}")
+            else:
+                changes = diff_mappings(previous_mapping, mapping)
+                if previous_mapping:
+                    logging.info(f"{instrument_type} changes: {len(changes['added'])} added, "
+                                 f"{len(changes['removed'])} removed, {len(changes['changed'])} changed")
+                
+                # Step 5: Save mappings to JSON
+                if not save_mapping_to_json(mapping, type_output_file, add_metadata, instrument_type, content_hash):
+                    logging.error(f"Failed to save {instrument_type} mappings. Exiting.")
+                    return
+                output_files.append(type_output_file)
+                
+                # Step 6: Record the diff so consumers can update incrementally
+                if previous_mapping and content_hash != previous_hash:
+                    changelog_file = mapping_changelog_filename(type_output_file)
+                    entry = {
+                        'generated_at': datetime.now().isoformat(),
+                        'instrument_type': instrument_type,
+                        'previous_hash': previous_hash,
+                        'content_hash': content_hash,
+                        **changes,
+                    }
+                    if append_mapping_changelog(changelog_file, entry):
+                        output_files.append(changelog_file)
+            
+            # Step 7: Save the binary index the dashboard memory-maps; the JSON
+            # stays the source of truth, so a failure here is not fatal
+            if type_output_file in output_files or not os.path.exists(index_file):
+                if save_mapping_index(mapping, index_file):
+                    output_files.append(index_file)
         
-        # Step 4: Save mappings to JSON
-        if not save_mapping_to_json(mapping, output_file):
-            logging.error("Failed to save FUTSTK mappings. Exiting.")
-            return
+        # Step 8: Load the whole scrip master into the queryable store
+        if db_file:
+            if not build_scrip_master_db(csv_filename, db_file):
+                logging.error("Failed to build the scrip master database. Exiting.")
+                return
+            output_files.append(db_file)
         
         # Success summary
         duration = datetime.now() - start_time
@@ -301,7 +1293,10 @@ def main(skip_download: bool = False,
         logging.info(f"Execution time: {duration.total_seconds():.2f} seconds")
         logging.info("Files created/updated:")
         logging.info(f"- {csv_filename} (downloaded)")
-        logging.info(f"- {output_file} (extracted mappings)")
+        for type_output_file in output_files:
+            logging.info(f"- {type_output_file} (extracted mappings)")
+        if not output_files:
+            logging.info("- none, all mappings unchanged")
         
     except KeyboardInterrupt:
         logging.info("Process interrupted by user")
@@ -314,7 +1309,7 @@ def parse_arguments():
     Parse command line arguments
     """
     parser = argparse.ArgumentParser(
-        description='Download NSE data and extract FUTSTK mappings',
+        description='Download NSE data and extract instrument mappings',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
@@ -322,6 +1317,8 @@ Examples:
   python fetch_and_extract.py --skip-download    # Use existing CSV file
   python fetch_and_extract.py -o custom.json     # Custom output filename
   python fetch_and_extract.py --url "custom_url" # Custom CSV URL
+  python fetch_and_extract.py -i FUTSTK OPTIDX   # Several types in one pass
+  python fetch_and_extract.py -s --build-db      # Also rebuild scrip_master.db offline
         """
     )
     
@@ -345,8 +1342,35 @@ Examples:
     
     parser.add_argument(
         '--instrument-type', '-i',
-        default='FUTSTK',
-        help='Instrument type to filter (default: %(default)s)'
+        nargs='+',
+        default=['FUTSTK'],
+        metavar='TYPE',
+        help='Instrument types to extract in one pass, e.g. FUTSTK FUTIDX OPTSTK OPTIDX; '
+             'with more than one type each is saved to <type>_mapping.json (default: FUTSTK)'
+    )
+    
+    parser.add_argument(
+        '--engine', '-e',
+        choices=CSV_ENGINES,
+        default='auto',
+        help='CSV parser for the scrip master; pyarrow and pandas read only the needed '
+             'columns, csv is the pure-Python fallback (default: %(default)s)'
+    )
+    
+    parser.add_argument(
+        '--force', '-f',
+        action='store_true',
+        help='Rewrite the mapping files even if their content is unchanged'
+    )
+    
+    parser.add_argument(
+        '--build-db',
+        nargs='?',
+        const=SCRIP_MASTER_DB,
+        default=None,
+        metavar='PATH',
+        help='Also load the whole scrip master into an indexed SQLite database '
+             '(default path when given without a value: %(const)s)'
     )
     
     parser.add_argument(
@@ -380,5 +1404,10 @@ if __name__ == "__main__":
     main(
         skip_download=args.skip_download,
         csv_url=args.url,
-        output_file=args.output
+        output_file=args.output,
+        instrument_types=args.instrument_type,
+        add_metadata=not args.no_metadata,
+        engine=args.engine,
+        force=args.force,
+        db_file=args.build_db
     )
\ No newline at end of file